@@ -33,10 +33,17 @@ def parse_args():
     )
 
     parser.add_argument(
-        "--max-workers",
+        "--fetch-workers",
         type=int,
-        default=4,
-        help="Parallel workers for extraction",
+        default=16,
+        help="Threads fetching filing documents",
+    )
+
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=None,
+        help="Processes parsing and extracting sections (default: all cores)",
     )
 
     parser.add_argument(
@@ -3,6 +3,9 @@ import logging
 import os
 from config.settings import OUTPUT_DIR
 
+LOG_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+
+
 def setup_logger(log_level=logging.INFO):
     """
     Global logging configuration.
@@ -15,7 +18,7 @@ def setup_logger(log_level=logging.INFO):
 
     logging.basicConfig(
         level=log_level,
-        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+        format=LOG_FORMAT,
         handlers=[
             logging.FileHandler(log_file, mode="w", encoding="utf-8"),
             logging.StreamHandler()
@@ -26,3 +29,21 @@ def setup_logger(log_level=logging.INFO):
     logger.info("Logger initialized")           # ✅ GHI LOG
     return logger                               # ✅ TRẢ LOGGER
 
+
+def setup_worker_logger(log_level=logging.INFO):
+    """
+    Logging for a spawned worker process: same format and log file as
+    the parent, appended to instead of truncated.
+    """
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    logging.basicConfig(
+        level=log_level,
+        format=LOG_FORMAT,
+        handlers=[
+            logging.FileHandler(
+                os.path.join(OUTPUT_DIR, "filing_fails.log"), mode="a", encoding="utf-8"
+            ),
+            logging.StreamHandler()
+        ]
+    )
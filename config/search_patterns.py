@@ -1,12 +1,66 @@
 # config/search_patterns.py
+import hashlib
 import json
 import os
-import copy
+import re
 import logging
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Tuple
 
 logger = logging.getLogger(__name__)
 
-def load_search_patterns(json_path: str) -> dict:
+SECTION_FLAGS = re.IGNORECASE | re.DOTALL
+
+
+@dataclass(frozen=True)
+class PatternPair:
+    """
+    One start/end delimiter pair, with the section regex
+    `start [\\s\\S]*? end` compiled once at load time. `start_regex` and
+    `end_regex` are the halves on their own; when both begin with a
+    newline (`line_anchored`) the heading index can resolve the pair.
+    """
+    start: str
+    end: str
+    regex: re.Pattern
+    start_regex: re.Pattern
+    end_regex: re.Pattern
+    line_anchored: bool
+
+
+@dataclass(frozen=True)
+class SectionPatterns:
+    itemname: str
+    html: Tuple[PatternPair, ...]
+
+
+class PatternRegistry(Mapping):
+    """
+    Immutable form type -> tuple of SectionPatterns mapping.
+
+    Plain attributes and compiled `re.Pattern` objects only, so it pickles
+    cheaply and a process pool can hand it to each worker once.
+    """
+
+    def __init__(self, forms):
+        self._forms = dict(forms)
+        self.version = _version(self._forms)
+
+    def __getitem__(self, form_type):
+        return self._forms[form_type]
+
+    def __iter__(self):
+        return iter(self._forms)
+
+    def __len__(self):
+        return len(self._forms)
+
+    def __repr__(self):
+        return f"PatternRegistry({', '.join(self._forms)})"
+
+
+def load_search_patterns(json_path: str) -> PatternRegistry:
     if not os.path.exists(json_path):
         logger.error(f"Search terms file not found: {json_path}")
         raise FileNotFoundError(json_path)
@@ -21,18 +75,20 @@ def load_search_patterns(json_path: str) -> dict:
     if not isinstance(search_terms, dict) or not search_terms:
         raise ValueError("Search terms JSON must be a non-empty dictionary")
 
-    search_terms_regex = copy.deepcopy(search_terms)
+    forms = {}
 
     for filing, sections in search_terms.items():
         if not isinstance(sections, list):
             logger.warning(f"Invalid sections format for filing {filing}")
             continue
 
+        compiled_sections = []
         for sec_idx, section in enumerate(sections):
             if not isinstance(section, dict) or "html" not in section:
                 logger.warning(f"Invalid section structure: {filing}[{sec_idx}]")
                 continue
 
+            pairs = []
             for pat_idx, pattern in enumerate(section["html"]):
                 if not isinstance(pattern, dict):
                     continue
@@ -41,20 +97,70 @@ def load_search_patterns(json_path: str) -> dict:
                         f"Missing start/end in pattern: {filing}[{sec_idx}][{pat_idx}]"
                     )
                     continue
+                if not all(isinstance(pattern[key], str) for key in ("start", "end")):
+                    continue
 
-                for key in ("start", "end"):
-                    regex_string = pattern[key]
-                    if not isinstance(regex_string, str):
-                        continue
+                pairs.append(
+                    _compile_pair(
+                        _to_regex(pattern["start"]),
+                        _to_regex(pattern["end"]),
+                        f"{filing}[{sec_idx}][{pat_idx}]",
+                    )
+                )
 
-                    regex_string = regex_string.replace("_", r"\s{,5}")
-                    regex_string = regex_string.replace("\n", r"\n")
+            compiled_sections.append(
+                SectionPatterns(
+                    itemname=section.get("itemname", "unknown_section"),
+                    html=tuple(pairs),
+                )
+            )
 
-                    search_terms_regex[filing][sec_idx]["html"][pat_idx][key] = regex_string
+        forms[filing] = tuple(compiled_sections)
 
     logger.info(
         "Loaded search patterns for filings: %s",
-        ", ".join(search_terms_regex.keys())
+        ", ".join(forms.keys())
     )
 
-    return search_terms_regex
+    return PatternRegistry(forms)
+
+
+def _version(forms):
+    """
+    Short digest of every form, section name and start/end pattern, so
+    results can be tied to the patterns that produced them.
+    """
+    digest = hashlib.sha1()
+    for form_type in sorted(forms):
+        for section in forms[form_type]:
+            digest.update(f"{form_type}\0{section.itemname}\0".encode("utf-8"))
+            for pair in section.html:
+                digest.update(f"{pair.start}\0{pair.end}\0".encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+def _to_regex(regex_string):
+    regex_string = regex_string.replace("_", r"\s{,5}")
+    return regex_string.replace("\n", r"\n")
+
+
+def _compile_pair(start, end, location):
+    try:
+        regex = re.compile(start + r"[\s\S]*?" + end, SECTION_FLAGS)
+    except re.error as e:
+        raise ValueError(f"Invalid search pattern {location}: {e}") from e
+
+    if regex.groups:
+        # Sections are whole matches; groups would only be captured and dropped
+        raise ValueError(
+            f"Search pattern {location} has capturing groups; use (?:...) instead"
+        )
+
+    return PatternPair(
+        start=start,
+        end=end,
+        regex=regex,
+        start_regex=re.compile(start, SECTION_FLAGS),
+        end_regex=re.compile(end, SECTION_FLAGS),
+        line_anchored=start.startswith(r"\n") and end.startswith(r"\n"),
+    )
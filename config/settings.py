@@ -10,6 +10,59 @@ START_DATE = "2023-01-15"
 END_DATE = "2025-04-25"
 OUTPUT_DIR = os.path.join("SEC_Filling_Knowlege_Extracting","data", "03_primary")
 
+# EDGAR HTTP client (shared by every fetch in the process)
+SEC_MAX_REQUESTS_PER_SECOND = 10   # SEC fair-access ceiling
+SEC_RATE_LIMIT_BURST = 1           # tokens the bucket may accumulate
+SEC_MAX_CONNECTIONS = 10           # keep-alive pool size; also the per-host concurrency ceiling
+SEC_INITIAL_CONCURRENCY = 2        # per-host in-flight requests before AIMD growth
+SEC_REQUEST_TIMEOUT = 30   # seconds to connect, and between reads of a body
+MAX_DOCUMENT_BYTES = 100 * 1024 ** 2   # refuse filing documents larger than this
+FETCH_COMPLETE_SUBMISSION = False      # one <accession>.txt per filing, split into exhibits
+
+# Extraction pipeline stages
+FETCH_WORKERS = 16                     # I/O threads; the client's limiter paces the wire
+PARSE_WORKERS = os.cpu_count() or 1    # processes for parsing and regex extraction
+EXTRACTION_METHOD = "regex"            # "regex" (BeautifulSoup walk) or "lxml" (linear lxml walk)
+RECORD_SOURCE_OFFSETS = True           # map plaintext offsets back to source bytes for provenance
+HTML_SLIMMING_ENABLED = True           # drop ix:header blocks and unused attributes before parsing
+REGEX_BACKEND = "re"                   # "re" (SIGALRM watchdog, main thread) or "regex" (per-call timeouts; needs the regex package)
+REGEX_TIME_BUDGET = 5.0                # seconds per section pattern and document before it is skipped
+INFLIGHT_BYTES_BUDGET = 512 * 1024 ** 2  # fetched bytes waiting for or in parsing; fetching pauses beyond
+QUEUE_REPORT_INTERVAL = 30             # seconds between per-stage queue depth log lines
+LARGEST_FIRST = True                   # dispatch filings by decreasing size to shorten the batch tail
+
+# Output sink: results are flushed as Parquet row groups while the batch runs
+SINK_ROW_GROUP_SIZE = 5_000            # rows buffered before a row group is written
+SINK_PART_ROWS = 5_000                 # section rows per commit; a crash loses at most these
+DATASET_COMPACT_MIN_FILES = 8          # partitions with this many part files are merged at close
+
+# Checkpoint manifest: completed filings are skipped when a run is resumed
+MANIFEST_ENABLED = True
+MANIFEST_DB_PATH = os.path.join("SEC_Filling_Knowlege_Extracting", "data", "02_intermediate", "manifest.sqlite")
+
+# Offline HTTP fixtures: "live", "record" (live + save responses) or "replay"
+SEC_HTTP_MODE = os.environ.get("SEC_HTTP_MODE", "live")
+SEC_FIXTURE_DIR = os.path.join("SEC_Filling_Knowlege_Extracting", "data", "00_fixtures")
+SEC_BASE_URL_OVERRIDE = os.environ.get("SEC_BASE_URL_OVERRIDE")   # e.g. a local fake_edgar server
+
+# Raw filing cache (accession documents never change once filed)
+RAW_CACHE_ENABLED = True
+RAW_CACHE_DIR = os.path.join("SEC_Filling_Knowlege_Extracting", "data", "01_raw", "filings")
+RAW_CACHE_MAX_BYTES = 20 * 1024 ** 3   # compressed bytes on disk
+RAW_CACHE_LOW_WATER = 0.9   # once over the cap, evict down to this fraction of it
+
+# Normalized plaintext per filing; pattern changes re-run from here without parsing
+PLAINTEXT_STORE_ENABLED = True
+PLAINTEXT_STORE_PATH = os.path.join("SEC_Filling_Knowlege_Extracting", "data", "02_intermediate", "plaintext.sqlite")
+
+# Incremental metadata refresh
+METADATA_DELTA_MODE = False   # only return filings newer than the stored watermark
+WATERMARK_DB_PATH = os.path.join("SEC_Filling_Knowlege_Extracting", "data", "02_intermediate", "watermarks.sqlite")
+
+# Offline metadata ingest; when set, main reads these instead of the submissions API
+BULK_SUBMISSIONS_ZIP = None    # path to EDGAR bulk submissions.zip
+BULK_FORM_INDEX_FILES = []     # paths to quarterly full-index form.idx files
+
 def load_ciks() -> pd.DataFrame:
     """
     Load default CIK universe.
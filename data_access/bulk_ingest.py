@@ -0,0 +1,169 @@
+# data_access/bulk_ingest.py
+import gzip
+import json
+import logging
+import os
+import re
+import zipfile
+
+import pandas as pd
+from tqdm import tqdm
+
+from .filing_metadata import FilingAccumulator
+
+logger = logging.getLogger(__name__)
+
+_MEMBER_RE = re.compile(r"CIK(\d{10})(?:-submissions-\d+)?\.json$")
+
+
+def ingest_submissions_zip(zip_path: str, ciks_df: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Build the filing metadata frame from a locally downloaded EDGAR bulk
+    `submissions.zip`, without any HTTP calls.
+
+    Members are decoded one at a time, so memory is bounded by the largest
+    single company file plus the selected rows. Both `filings.recent` and
+    the paginated `CIK##########-submissions-NNN.json` history files are
+    read. With `ciks_df=None` the whole universe in the archive is ingested
+    and tickers come from the submissions JSON.
+    """
+    tickers = _ticker_map(ciks_df)
+    accumulator = FilingAccumulator()
+
+    with zipfile.ZipFile(zip_path) as archive:
+        members = [
+            info for info in archive.infolist()
+            if _MEMBER_RE.search(info.filename)
+        ]
+
+        for info in tqdm(members, desc="Ingesting submissions.zip"):
+            cik = _MEMBER_RE.search(info.filename).group(1)
+            if tickers is not None and cik not in tickers:
+                continue
+
+            try:
+                with archive.open(info) as f:
+                    data = json.load(f)
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                logger.warning(f"Skipping unreadable member {info.filename}: {e}")
+                continue
+
+            if "filings" in data:
+                # Company file: header fields plus the `recent` columns
+                filings = data["filings"].get("recent", {})
+                ticker = _ticker_for(cik, tickers, data)
+            else:
+                # History page: the columns sit at the top level
+                filings = data
+                ticker = _ticker_for(cik, tickers, None)
+
+            if not filings:
+                continue
+
+            accumulator.add(filings, cik, ticker)
+
+    filings_df = accumulator.to_frame()
+    if filings_df.empty:
+        return filings_df
+
+    filings_df = filings_df.drop_duplicates(subset="accessionNumber", ignore_index=True)
+
+    if tickers is None:
+        # History pages carry no ticker; borrow it from the company file
+        known = filings_df.dropna(subset=["ticker"]).groupby("cik")["ticker"].first()
+        filings_df["ticker"] = filings_df["ticker"].fillna(filings_df["cik"].map(known))
+
+    logger.info(f"Ingested {len(filings_df)} filings from {zip_path}")
+    return filings_df
+
+
+def ingest_form_index(index_paths, ciks_df: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Build the filing metadata frame from quarterly EDGAR full-index
+    `form.idx` files (plain or .gz), streamed line by line.
+
+    The index does not name the primary document, so `primaryDocument`
+    is the complete submission file (`<accession>.txt`) and `filingUrl`
+    points at it.
+    """
+    if isinstance(index_paths, str):
+        index_paths = [index_paths]
+
+    tickers = _ticker_map(ciks_df)
+    accumulator = FilingAccumulator()
+
+    for path in index_paths:
+        for form, cik, filed, file_name in _iter_form_index(path):
+            if form not in ("10-K", "10-Q"):
+                continue
+
+            cik = cik.zfill(10)
+            if tickers is not None and cik not in tickers:
+                continue
+
+            accession = os.path.basename(file_name)[:-len(".txt")]
+            accumulator.add(
+                {
+                    "form": [form],
+                    "filingDate": [filed],
+                    "accessionNumber": [accession],
+                    "primaryDocument": [f"{accession}.txt"],
+                },
+                cik,
+                _ticker_for(cik, tickers, None),
+            )
+
+    filings_df = accumulator.to_frame()
+    logger.info(f"Ingested {len(filings_df)} filings from {len(index_paths)} index files")
+    return filings_df
+
+
+# ==========================================================
+# Helpers
+# ==========================================================
+
+def _iter_form_index(path):
+    """
+    Yield (form, cik, date_filed, file_name) from a fixed-width form.idx.
+    Column offsets are taken from the header line.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+
+    with opener(path, "rt", encoding="latin-1") as f:
+        offsets = None
+
+        for line in f:
+            if offsets is None:
+                if line.startswith("Form Type"):
+                    offsets = (
+                        line.index("CIK"),
+                        line.index("Date Filed"),
+                        line.index("File Name"),
+                    )
+                continue
+
+            if line.startswith("---") or not line.strip():
+                continue
+
+            cik_at, date_at, file_at = offsets
+            form = line[:line.index("  ")].strip() if "  " in line else line.split()[0]
+            yield (
+                form,
+                line[cik_at:date_at].strip(),
+                line[date_at:file_at].strip(),
+                line[file_at:].strip(),
+            )
+
+
+def _ticker_map(ciks_df):
+    if ciks_df is None:
+        return None
+    return dict(zip(ciks_df["cik"], ciks_df["ticker"]))
+
+
+def _ticker_for(cik, tickers, data):
+    if tickers is not None:
+        return tickers[cik]
+    if data and data.get("tickers"):
+        return data["tickers"][0]
+    return None
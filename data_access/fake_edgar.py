@@ -0,0 +1,160 @@
+# data_access/fake_edgar.py
+"""
+Local stand-in for EDGAR that serves recorded fixtures.
+
+Point the pipeline at it with SEC_BASE_URL_OVERRIDE=http://127.0.0.1:<port>;
+the client then requests /<original host>/<original path>. Latency, 429
+injection and a bandwidth cap are configurable and seeded, so throughput
+changes to the fetch/extract pipeline can be benchmarked offline:
+
+    python -m data_access.fake_edgar --fixtures data/00_fixtures \\
+        --latency-ms 80 --error-rate 0.05 --bandwidth-kbps 4096
+"""
+import argparse
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config.settings import SEC_FIXTURE_DIR
+from .fixtures import FixtureStore
+
+logger = logging.getLogger(__name__)
+
+
+class FakeEdgarServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        fixtures: FixtureStore,
+        latency_ms=0,
+        jitter_ms=0,
+        error_rate=0.0,
+        retry_after=1,
+        bandwidth_kbps=None,
+        seed=0,
+    ):
+        super().__init__(address, _FakeEdgarHandler)
+        self.fixtures = fixtures
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.bandwidth_kbps = bandwidth_kbps
+
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self.stats = {"served": 0, "throttled": 0, "missing": 0, "not_modified": 0}
+
+    def draw(self):
+        with self._random_lock:
+            return self._random.random()
+
+    def count(self, key):
+        with self._random_lock:
+            self.stats[key] += 1
+
+
+class _FakeEdgarHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    chunk_size = 16 * 1024
+
+    def do_GET(self):
+        server = self.server
+        host, _, path = self.path.lstrip("/").partition("/")
+        url = f"https://{host}/{path}"
+
+        delay = server.latency_ms + server.jitter_ms * server.draw()
+        if delay:
+            time.sleep(delay / 1000)
+
+        if server.error_rate and server.draw() < server.error_rate:
+            server.count("throttled")
+            self._send_empty(429, {"Retry-After": str(server.retry_after)})
+            return
+
+        recorded = server.fixtures.load(url)
+        if recorded is None:
+            server.count("missing")
+            self._send_empty(404)
+            return
+
+        meta, body = recorded
+        headers = meta["headers"]
+        etag = headers.get("ETag") or headers.get("Etag")
+        if etag and self.headers.get("If-None-Match") == etag:
+            server.count("not_modified")
+            self._send_empty(304, {"ETag": etag})
+            return
+
+        self.send_response(meta["status_code"])
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self._write_throttled(body)
+        server.count("served")
+
+    def _send_empty(self, status, headers=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _write_throttled(self, body):
+        bandwidth = self.server.bandwidth_kbps
+        if not bandwidth:
+            self.wfile.write(body)
+            return
+
+        bytes_per_second = bandwidth * 1024
+        for offset in range(0, len(body), self.chunk_size):
+            chunk = body[offset:offset + self.chunk_size]
+            self.wfile.write(chunk)
+            time.sleep(len(chunk) / bytes_per_second)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded EDGAR fixtures locally")
+    parser.add_argument("--fixtures", default=SEC_FIXTURE_DIR)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--bandwidth-kbps", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = FakeEdgarServer(
+        (args.host, args.port),
+        FixtureStore(args.fixtures),
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        retry_after=args.retry_after,
+        bandwidth_kbps=args.bandwidth_kbps,
+        seed=args.seed,
+    )
+    logger.info(f"Fake EDGAR serving {args.fixtures} on http://{args.host}:{args.port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info(f"Fake EDGAR stats: {server.stats}")
+
+
+if __name__ == "__main__":
+    main()
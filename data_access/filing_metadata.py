@@ -4,72 +4,176 @@ import pandas as pd
 from tqdm import tqdm
 
 from config.settings import START_DATE, END_DATE
-from .sec_client import safe_get
+from .sec_client import get_client
 
 logger = logging.getLogger(__name__)
 
-def fetch_filing_metadata(ciks_df: pd.DataFrame) -> pd.DataFrame:
+ARCHIVES_URL = "https://www.sec.gov/Archives/edgar/data/"
+FORM_TYPES = ["10-K", "10-Q"]
+SUBMISSION_COLUMNS = ("form", "filingDate", "accessionNumber", "primaryDocument", "size")
+METADATA_COLUMNS = [
+    "cik",
+    "ticker",
+    "form",
+    "filingDate",
+    "accessionNumber",
+    "primaryDocument",
+    "filingUrl",
+    "size",  # bytes of the whole submission, when the source reports it
+]
+
+
+class FilingAccumulator:
+    """
+    Columnar collector for submissions data from many CIKs.
+
+    Each CIK's columns are appended to flat lists; every `flush_rows` rows
+    the buffer becomes one DataFrame and is filtered with vectorized
+    expressions, so work stays linear in the number of filings and memory
+    is bounded by the chunk size plus the selected rows.
+    """
+
+    def __init__(self, flush_rows=500_000):
+        self.flush_rows = flush_rows
+        self._frames = []
+        self._reset()
+
+    def _reset(self):
+        self._columns = {name: [] for name in ("cik", "ticker", *SUBMISSION_COLUMNS)}
+        self._rows = 0
+
+    def add(self, filings, cik, ticker):
+        n_rows = len(filings.get("accessionNumber", []))
+        if not n_rows:
+            return
+
+        for name in SUBMISSION_COLUMNS:
+            self._columns[name].extend(filings.get(name) or [None] * n_rows)
+        self._columns["cik"].extend([cik] * n_rows)
+        self._columns["ticker"].extend([ticker] * n_rows)
+
+        self._rows += n_rows
+        if self._rows >= self.flush_rows:
+            self._flush()
+
+    def _flush(self):
+        if self._rows:
+            df = select_filings(pd.DataFrame(self._columns))
+            if not df.empty:
+                self._frames.append(df)
+        self._reset()
+
+    def to_frame(self) -> pd.DataFrame:
+        self._flush()
+        if not self._frames:
+            return pd.DataFrame()
+        return pd.concat(self._frames, ignore_index=True)
+
+
+def fetch_filing_metadata(ciks_df: pd.DataFrame, watermarks=None) -> pd.DataFrame:
     """
     Fetch 10-K / 10-Q filings metadata for given CIK universe.
+
+    When a WatermarkStore is given, runs in delta mode: submissions are
+    requested conditionally (a 304 means nothing new) and only filings
+    newer than each CIK's stored accession are returned. New watermarks
+    are staged on the store; the caller commits them once the run is done.
     """
-    all_filings = []
+    accumulator = FilingAccumulator()
+
+    # Submissions are requested concurrently through the shared client;
+    # its rate limiter keeps the burst under SEC's ceiling. One request per
+    # CIK, whose filings are listed under each of its tickers (GOOG, GOOGL).
+    universe = {}
+    for cik, ticker in zip(ciks_df["cik"], ciks_df["ticker"]):
+        url = f"https://data.sec.gov/submissions/CIK{cik}.json"
+        universe.setdefault(url, (cik, []))[1].append(ticker)
+
+    conditional = {}
+    if watermarks is not None:
+        for url, (cik, _) in universe.items():
+            headers = watermarks.conditional_headers(cik)
+            if headers:
+                conditional[url] = headers
+
+    responses = get_client().iter_get(universe, headers=conditional)
 
-    for _, row in tqdm(ciks_df.iterrows(), total=len(ciks_df), desc="Fetching filings"):
-        cik = row["cik"]
-        ticker = row["ticker"]
+    for url, response in tqdm(responses, total=len(universe), desc="Fetching filings"):
+        cik, tickers = universe[url]
 
         try:
-            response = safe_get(f"https://data.sec.gov/submissions/CIK{cik}.json")
             if response is None:
                 continue
 
+            if response.status_code == 304:
+                logger.debug(f"Submissions unchanged for CIK {cik}")
+                continue
+
             data = response.json()
             filings = data.get("filings", {}).get("recent", {})
             if not filings:
                 continue
 
-            df = pd.DataFrame(filings)
-            df = df[df["form"].isin(["10-K", "10-Q"])]
+            if watermarks is not None:
+                filings = _filings_since_watermark(cik, filings, response, watermarks)
+                if not filings["accessionNumber"]:
+                    continue
 
-            if df.empty:
-                continue
+            for ticker in tickers:
+                accumulator.add(filings, cik, ticker)
 
-            df["filingDate"] = pd.to_datetime(df["filingDate"], errors="coerce")
-            df = df[
-                (df["filingDate"] >= START_DATE) &
-                (df["filingDate"] <= END_DATE)
-            ]
+        except Exception as e:
+            logger.exception(f"Error fetching filings for CIK {cik}")
 
-            if df.empty:
-                continue
+    return accumulator.to_frame()
 
-            df["cik"] = cik
-            df["ticker"] = ticker
-
-            df["filingUrl"] = df.apply(
-                lambda x: (
-                    f"https://www.sec.gov/Archives/edgar/data/"
-                    f"{cik}/{x['accessionNumber'].replace('-', '')}/{x['primaryDocument']}"
-                ),
-                axis=1
-            )
-
-            all_filings.append(
-                df[[
-                    "cik",
-                    "ticker",
-                    "form",
-                    "filingDate",
-                    "accessionNumber",
-                    "primaryDocument",
-                    "filingUrl"
-                ]]
-            )
 
-        except Exception as e:
-            logger.exception(f"Error fetching filings for CIK {cik}")
+def select_filings(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Filter a frame of submissions columns (plus `cik` and `ticker`) to
+    10-K / 10-Q filings inside the configured date window and add
+    `filingUrl`. Every step is a whole-column operation.
+    """
+    df = df[df["form"].isin(FORM_TYPES)]
+
+    filing_date = pd.to_datetime(df["filingDate"], format="%Y-%m-%d", errors="coerce")
+    in_window = (filing_date >= START_DATE) & (filing_date <= END_DATE)
+    df = df[in_window].assign(filingDate=filing_date[in_window])
+
+    df["filingUrl"] = (
+        ARCHIVES_URL
+        + df["cik"]
+        + "/"
+        + df["accessionNumber"].str.replace("-", "", regex=False)
+        + "/"
+        + df["primaryDocument"]
+    )
 
-    if not all_filings:
-        return pd.DataFrame()
+    return df[METADATA_COLUMNS].reset_index(drop=True)
 
-    return pd.concat(all_filings, ignore_index=True)
+
+def _filings_since_watermark(cik, filings, response, watermarks):
+    """
+    Trim the newest-first `recent` columns to filings after the stored
+    watermark and stage the new watermark for this CIK.
+    """
+    accessions = filings.get("accessionNumber", [])
+    mark = watermarks.get(cik)
+
+    new_count = len(accessions)
+    if mark and mark["last_accession"] in accessions:
+        new_count = accessions.index(mark["last_accession"])
+
+    if accessions:
+        watermarks.stage(
+            cik,
+            accessions[0],
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            accessions=accessions[:new_count + 1],
+        )
+
+    return {
+        column: values[:new_count] if isinstance(values, list) else values
+        for column, values in filings.items()
+    }
@@ -0,0 +1,71 @@
+# data_access/fixtures.py
+import hashlib
+import json
+import logging
+import os
+from urllib.parse import urlsplit
+
+from config.settings import SEC_FIXTURE_DIR
+
+logger = logging.getLogger(__name__)
+
+
+class FixtureStore:
+    """
+    On-disk store of recorded EDGAR responses, keyed by URL.
+
+    Each response is kept as `<host>/<sha[:2]>/<sha>.body` with a JSON
+    sidecar holding the URL, status, headers and charset, so the same
+    store can feed replay mode and the local fake_edgar server.
+    """
+
+    def __init__(self, root=SEC_FIXTURE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _paths(self, url):
+        # Scheme-agnostic, so the fake server can look up what it is asked for
+        parts = urlsplit(url)
+        key = f"{parts.netloc}{parts.path}?{parts.query}"
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        base = os.path.join(self.root, parts.netloc, digest[:2], digest)
+        return f"{base}.body", f"{base}.json"
+
+    def save(self, response):
+        body_path, meta_path = self._paths(response.url)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+
+        with open(body_path, "wb") as f:
+            f.write(response.content)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "url": response.url,
+                    "status_code": response.status_code,
+                    "headers": {
+                        key: value
+                        for key, value in response.headers.items()
+                        if key.lower() in ("content-type", "etag", "last-modified")
+                    },
+                    "encoding": response.encoding,
+                },
+                f,
+                indent=2,
+            )
+
+    def load(self, url):
+        """
+        Return (meta dict, body bytes) for a recorded URL, or None.
+        """
+        body_path, meta_path = self._paths(url)
+        if not os.path.exists(meta_path):
+            return None
+
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(body_path, "rb") as f:
+            body = f.read()
+        return meta, body
+
+    def __contains__(self, url):
+        return os.path.exists(self._paths(url)[1])
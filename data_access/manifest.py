@@ -0,0 +1,178 @@
+# data_access/manifest.py
+import logging
+import os
+import sqlite3
+import time
+
+from config.settings import MANIFEST_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+DONE = "done"
+EMPTY = "empty"
+FAILED = "failed"
+
+
+class ExtractionManifest:
+    """
+    Durable per-accession, per-section record of extraction progress, so
+    an interrupted run resumes where it stopped.
+
+    A filing is `done` once its rows are committed by the output sink,
+    with the content hash of each section, and `empty` when there was
+    nothing to extract, with the reason in `error`. Both count as
+    complete only for the version that produced them: `version` names
+    the search patterns and parser, and changing either makes every
+    filing eligible again. `failed` filings are always retried. Patterns
+    that timed out are kept per section in `section_errors`, whatever the
+    filing's status. WAL mode keeps each mark a cheap append.
+    """
+
+    def __init__(self, version, db_path=MANIFEST_DB_PATH):
+        self.version = version
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._db = sqlite3.connect(db_path, timeout=60)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS filings (
+                accession_number TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                version TEXT NOT NULL,
+                n_sections INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS sections (
+                accession_number TEXT NOT NULL,
+                section TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                version TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (accession_number, section)
+            );
+            CREATE TABLE IF NOT EXISTS section_errors (
+                accession_number TEXT NOT NULL,
+                section TEXT NOT NULL,
+                document TEXT NOT NULL,
+                error TEXT NOT NULL,
+                version TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS section_errors_accession
+                ON section_errors (accession_number);
+            """
+        )
+        self._db.commit()
+
+    def completed(self) -> set:
+        """
+        Accession numbers already done (or empty) under this version.
+        """
+        rows = self._db.execute(
+            "SELECT accession_number FROM filings WHERE status IN (?, ?) AND version = ?",
+            (DONE, EMPTY, self.version),
+        )
+        return {accession_number for accession_number, in rows}
+
+    def failed(self) -> set:
+        """
+        Accession numbers whose last attempt failed, under any version.
+        """
+        rows = self._db.execute(
+            "SELECT accession_number FROM filings WHERE status = ?", (FAILED,)
+        )
+        return {accession_number for accession_number, in rows}
+
+    def mark_done(self, filings):
+        """
+        Record committed filings: (accession number, [(section, content
+        hash), ...]) pairs. Sections a filing no longer has are dropped.
+        """
+        now = time.time()
+        with self._db:
+            for accession_number, sections in filings:
+                self._db.execute(
+                    "DELETE FROM sections WHERE accession_number = ?", (accession_number,)
+                )
+                self._db.executemany(
+                    "INSERT INTO sections VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (accession_number, section, content_hash, self.version, now)
+                        for section, content_hash in sections
+                    ],
+                )
+                self._set_status(accession_number, DONE, len(sections), None, now)
+
+    def mark_empty(self, accession_number, reason=None):
+        with self._db:
+            self._set_status(
+                accession_number, EMPTY, 0, str(reason)[:500] if reason else None, time.time()
+            )
+
+    def mark_failed(self, accession_number, error):
+        with self._db:
+            self._set_status(accession_number, FAILED, 0, str(error)[:500], time.time())
+
+    def mark_section_errors(self, accession_number, errors):
+        """
+        Replace a filing's section errors with `errors`, (section,
+        document, error) triples from its latest extraction.
+        """
+        now = time.time()
+        with self._db:
+            self._db.execute(
+                "DELETE FROM section_errors WHERE accession_number = ?", (accession_number,)
+            )
+            self._db.executemany(
+                "INSERT INTO section_errors VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (accession_number, section, document, str(error)[:500], self.version, now)
+                    for section, document, error in errors
+                ],
+            )
+
+    def section_errors(self) -> list:
+        """
+        (accession number, section, document, error) of every section
+        error recorded under this version.
+        """
+        rows = self._db.execute(
+            "SELECT accession_number, section, document, error FROM section_errors "
+            "WHERE version = ? ORDER BY accession_number, section",
+            (self.version,),
+        )
+        return rows.fetchall()
+
+    def summary(self) -> dict:
+        """
+        {status: number of filings} under this version.
+        """
+        rows = self._db.execute(
+            "SELECT status, COUNT(*) FROM filings WHERE version = ? GROUP BY status",
+            (self.version,),
+        )
+        return dict(rows.fetchall())
+
+    def close(self):
+        self._db.close()
+
+    def _set_status(self, accession_number, status, n_sections, error, now):
+        self._db.execute(
+            """
+            INSERT INTO filings
+                (accession_number, status, version, n_sections, attempts, error, updated_at)
+            VALUES (?, ?, ?, ?, 1, ?, ?)
+            ON CONFLICT(accession_number) DO UPDATE SET
+                status = excluded.status,
+                version = excluded.version,
+                n_sections = excluded.n_sections,
+                attempts = attempts + 1,
+                error = excluded.error,
+                updated_at = excluded.updated_at
+            """,
+            (accession_number, status, self.version, n_sections, error, now),
+        )
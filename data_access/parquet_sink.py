@@ -0,0 +1,393 @@
+# data_access/parquet_sink.py
+import logging
+import os
+import time
+import uuid
+from urllib.parse import quote
+
+import polars as pl
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from config.settings import (
+    OUTPUT_DIR,
+    SINK_ROW_GROUP_SIZE,
+    SINK_PART_ROWS,
+    DATASET_COMPACT_MIN_FILES,
+)
+
+logger = logging.getLogger(__name__)
+
+SECTION_SCHEMA = pa.schema(
+    [
+        ("cik", pa.string()),
+        ("ticker", pa.string()),
+        ("form_type", pa.string()),
+        ("filed_at", pa.timestamp("us")),
+        ("accession_number", pa.string()),
+        ("section", pa.string()),
+        ("document", pa.string()),
+        ("content", pa.large_string()),
+        ("n_characters", pa.int64()),
+        ("content_hash", pa.string()),
+        ("extraction_method", pa.string()),
+        ("warnings", pa.string()),
+        # Offsets of the section in the fetched document, when recorded
+        ("source_start", pa.int64()),
+        ("source_end", pa.int64()),
+        # Same for every row of one extraction; the newest one wins
+        ("extracted_at", pa.timestamp("us", tz="UTC")),
+    ]
+)
+
+# Section dataset layout: form_type=.../year=.../ticker=.../part-*.parquet
+PARTITIONING = ds.partitioning(
+    pa.schema([("form_type", pa.string()), ("year", pa.int32()), ("ticker", pa.string())]),
+    flavor="hive",
+)
+_NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+# Partition values live in the path, not in the files
+SECTION_FILE_SCHEMA = pa.schema(
+    [field for field in SECTION_SCHEMA if field.name not in ("form_type", "ticker")]
+)
+
+TABLE_SCHEMA = pa.schema(
+    [
+        ("accession_number", pa.string()),
+        ("section", pa.string()),
+        ("table_ordinal", pa.int32()),
+        ("row_index", pa.int32()),
+        ("column_index", pa.int32()),
+        ("header", pa.string()),
+        ("text", pa.string()),
+        ("value", pa.float64()),
+        ("extracted_at", pa.timestamp("us", tz="UTC")),
+    ]
+)
+
+
+class ParquetSink:
+    """
+    Incremental Parquet writer for a directory of part files.
+
+    Rows are buffered column-wise and written out as a row group every
+    `row_group_size` rows, so memory stays flat however many filings a
+    run processes. A part file is written under a hidden temporary name
+    and renamed on `commit` (automatically once it holds `part_rows`
+    rows, unless that is None), so readers only ever see complete files
+    and a crash loses at most the open part.
+    """
+
+    def __init__(
+        self,
+        directory,
+        schema,
+        row_group_size=SINK_ROW_GROUP_SIZE,
+        part_rows=SINK_PART_ROWS,
+    ):
+        self.directory = directory
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.part_rows = part_rows
+        os.makedirs(directory, exist_ok=True)
+
+        # Unique per sink, so runs and processes never overwrite each other
+        self._run = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self._columns = {name: [] for name in schema.names}
+        self._buffered = 0
+        self._writer = None
+        self._part = 0
+        self._part_path = None
+        self.rows_in_part = 0
+        self.rows_written = 0
+
+    @property
+    def pending_rows(self):
+        return self._buffered
+
+    def write_rows(self, rows):
+        """
+        Buffer row dicts; missing keys become nulls.
+        """
+        for row in rows:
+            for name, values in self._columns.items():
+                values.append(row.get(name))
+        self._buffered += len(rows)
+        if self._buffered >= self.row_group_size:
+            self.flush()
+
+    def write_columns(self, columns):
+        """
+        Buffer rows given as {column: values}, all of one length.
+        """
+        n = len(next(iter(columns.values()), ()))
+        for name, values in self._columns.items():
+            values.extend(columns[name] if name in columns else [None] * n)
+        self._buffered += n
+        if self._buffered >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write buffered rows as one row group of the open part file.
+        """
+        if not self._buffered:
+            return
+
+        table = pa.Table.from_pydict(self._columns, schema=self.schema)
+        if self._writer is None:
+            self._open_part()
+        self._writer.write_table(table, row_group_size=len(table))
+
+        for values in self._columns.values():
+            values.clear()
+        self.rows_in_part += self._buffered
+        self.rows_written += self._buffered
+        self._buffered = 0
+
+        if self.part_rows is not None and self.rows_in_part >= self.part_rows:
+            self.commit()
+
+    def commit(self):
+        """
+        Flush and publish the open part file, if any.
+        """
+        self.flush()
+        if self._writer is not None:
+            self._close_part()
+
+    def close(self):
+        self.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _open_part(self):
+        name = f"part-{self._run}-{self._part:05d}.parquet"
+        self._part_path = os.path.join(self.directory, name)
+        # Hidden while open: dataset readers skip names starting with "."
+        self._writer = pq.ParquetWriter(self._temporary(self._part_path), self.schema)
+
+    def _close_part(self):
+        self._writer.close()
+        os.replace(self._temporary(self._part_path), self._part_path)
+        logger.debug(f"Wrote {self.rows_in_part} rows to {self._part_path}")
+        self._writer = None
+        self._part += 1
+        self.rows_in_part = 0
+
+    @staticmethod
+    def _temporary(path):
+        directory, name = os.path.split(path)
+        return os.path.join(directory, f".{name}.tmp")
+
+
+class SectionDataset:
+    """
+    Extracted sections as a hive-partitioned Parquet dataset under
+    `directory`, partitioned by form type, filing year and ticker, so
+    readers prune partitions instead of scanning every section.
+
+    Rows are buffered per partition, and `commit` writes one new file
+    into each partition it touched. Appending never rewrites existing
+    files, so daily incremental runs stay cheap. Re-extracting a filing
+    upserts it: every row carries `extracted_at`, and for each accession
+    only the rows of its newest extraction count. That rule is applied by
+    `read_sections` and by `compact`, which merges a partition's small
+    files into one and drops the superseded rows.
+    """
+
+    def __init__(self, directory, part_rows=SINK_PART_ROWS, row_group_size=SINK_ROW_GROUP_SIZE):
+        self.directory = directory
+        self.part_rows = part_rows
+        self.row_group_size = row_group_size
+        os.makedirs(directory, exist_ok=True)
+
+        self._run = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self._commits = 0
+        self._partitions = {}
+        self.pending_rows = 0
+        self.rows_written = 0
+        self.touched = set()
+
+    def write_rows(self, rows):
+        for row in rows:
+            filed_at = row.get("filed_at")
+            key = (row.get("form_type"), getattr(filed_at, "year", None), row.get("ticker"))
+
+            columns = self._partitions.get(key)
+            if columns is None:
+                columns = self._partitions[key] = {
+                    name: [] for name in SECTION_FILE_SCHEMA.names
+                }
+            for name, values in columns.items():
+                values.append(row.get(name))
+        self.pending_rows += len(rows)
+
+    def commit(self):
+        """
+        Write the buffered rows, one new file per partition.
+        """
+        for key, columns in self._partitions.items():
+            directory = self._partition_dir(key)
+            table = pa.Table.from_pydict(columns, schema=SECTION_FILE_SCHEMA)
+            _write_file(
+                table,
+                os.path.join(directory, f"part-{self._run}-{self._commits:05d}.parquet"),
+                self.row_group_size,
+            )
+            self.touched.add(directory)
+
+        self.rows_written += self.pending_rows
+        self._partitions = {}
+        self.pending_rows = 0
+        self._commits += 1
+
+    def compact(self, directories=None, min_files=DATASET_COMPACT_MIN_FILES):
+        """
+        Rewrite each partition directory holding at least `min_files`
+        part files as a single file of its newest rows. Defaults to every
+        partition of the dataset.
+        """
+        if directories is None:
+            directories = {root for root, _, files in os.walk(self.directory) if _part_files(files)}
+
+        for directory in sorted(directories):
+            files = _part_files(os.listdir(directory))
+            if len(files) < min_files:
+                continue
+
+            paths = [os.path.join(directory, name) for name in files]
+            table = _latest_rows(ds.dataset(paths, schema=SECTION_FILE_SCHEMA).to_table())
+            compacted = os.path.join(directory, f"part-{self._run}-compacted.parquet")
+            _write_file(table, compacted, self.row_group_size)
+            # The merged file is in place first: a crash here only leaves
+            # duplicates, which readers drop
+            for path in paths:
+                if path != compacted:
+                    os.remove(path)
+            logger.info(f"Compacted {len(paths)} files into {table.num_rows} rows: {directory}")
+
+    def close(self):
+        self.commit()
+
+    def _partition_dir(self, key):
+        segments = [
+            f"{name}={_NULL_PARTITION if value is None else quote(str(value), safe='')}"
+            for name, value in zip(PARTITIONING.schema.names, key)
+        ]
+        directory = os.path.join(self.directory, *segments)
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+
+def read_sections(directory=os.path.join(OUTPUT_DIR, "filing_data"), filter=None) -> pl.DataFrame:
+    """
+    Current sections of the dataset: the newest extraction of each
+    accession. `filter` is a pyarrow expression, e.g.
+    `(ds.field("form_type") == "10-K") & (ds.field("year") == 2024)`;
+    filters on partition columns skip whole directories.
+    """
+    dataset = ds.dataset(directory, format="parquet", partitioning=PARTITIONING)
+    return pl.from_arrow(_latest_rows(dataset.to_table(filter=filter)))
+
+
+def read_tables(directory=os.path.join(OUTPUT_DIR, "filing_tables"), filter=None) -> pl.DataFrame:
+    """
+    Table cells of the newest extraction of each accession.
+    """
+    dataset = ds.dataset(directory, format="parquet", schema=TABLE_SCHEMA)
+    return pl.from_arrow(_latest_rows(dataset.to_table(filter=filter), unique=False))
+
+
+def _latest_rows(table, unique=True):
+    frame = pl.from_arrow(table).filter(
+        pl.col("extracted_at") == pl.col("extracted_at").max().over("accession_number")
+    )
+    if unique:
+        # Copies left by an interrupted compaction
+        frame = frame.unique(subset=["accession_number", "section"], keep="first", maintain_order=True)
+    return frame.to_arrow().cast(table.schema)
+
+
+def _part_files(names):
+    return sorted(name for name in names if name.startswith("part-") and name.endswith(".parquet"))
+
+
+def _write_file(table, path, row_group_size):
+    # Written under a hidden name and renamed, so readers never see it half done
+    temporary = ParquetSink._temporary(path)
+    pq.write_table(table, temporary, row_group_size=row_group_size)
+    os.replace(temporary, path)
+
+
+class FilingSink:
+    """
+    Section rows and table cells of extracted filings, written under
+    `output_dir` as the section dataset (filing_data/) and a directory of
+    table part files (filing_tables/).
+
+    Both are committed together, every `part_rows` section rows, and
+    `on_commit` is then called with the (accession number, [(section,
+    content hash), ...]) of every filing whose rows just became durable.
+    """
+
+    def __init__(self, output_dir=OUTPUT_DIR, part_rows=SINK_PART_ROWS, on_commit=None):
+        self.sections = SectionDataset(os.path.join(output_dir, "filing_data"))
+        self.tables = ParquetSink(
+            os.path.join(output_dir, "filing_tables"), TABLE_SCHEMA, part_rows=None
+        )
+        self.part_rows = part_rows
+        self.on_commit = on_commit
+        self._uncommitted = []
+
+    @property
+    def pending_rows(self):
+        """
+        Section rows written but not yet committed.
+        """
+        return self.sections.pending_rows
+
+    def write(self, result):
+        """
+        Add one filing's FilingResult (section rows and table columns).
+        """
+        self.sections.write_rows(result.rows)
+        self.tables.write_columns(result.tables)
+        if result.rows:
+            self._uncommitted.append(
+                (
+                    result.rows[0]["accession_number"],
+                    [(row["section"], row["content_hash"]) for row in result.rows],
+                )
+            )
+
+        if self.sections.pending_rows >= self.part_rows:
+            self.commit()
+
+    def commit(self):
+        # Tables first: a filing is only reported once all its rows are out
+        self.tables.commit()
+        self.sections.commit()
+        if self.on_commit is not None and self._uncommitted:
+            self.on_commit(self._uncommitted)
+        self._uncommitted = []
+
+    def close(self):
+        self.commit()
+        # Periodic compaction: partitions this run left with many small files
+        self.sections.compact(self.sections.touched)
+        logger.info(
+            f"Saved {self.sections.rows_written} extracted sections "
+            f"and {self.tables.rows_written} table cells"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
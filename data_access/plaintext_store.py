@@ -0,0 +1,167 @@
+# data_access/plaintext_store.py
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from config.settings import PLAINTEXT_STORE_PATH
+
+logger = logging.getLogger(__name__)
+
+
+class PreparedDocument:
+    """
+    Normalized plaintext of one filing document (a primary document or
+    one part of a complete submission) and the rows of its data tables.
+    """
+
+    def __init__(self, document, doc_type, plaintext, tables, offsets=None):
+        self.document = document
+        self.doc_type = doc_type
+        self.plaintext = plaintext
+        self.tables = tables
+        # Serialized OffsetMap (plaintext -> source offsets), if recorded
+        self.offsets = offsets
+
+
+class PlaintextStore:
+    """
+    Persistent store of `prepare_text` output, so section patterns can be
+    re-run over filings without fetching or parsing their HTML again.
+
+    Rows are keyed by (accession number, source, document), where `source`
+    is the file that was fetched (primary document or `<accession>.txt`).
+    Text and tables are zlib-compressed. Each row carries the parser
+    version that produced it, and rows from another version are ignored.
+    WAL mode lets parse worker processes, each with its own connection,
+    write concurrently.
+    """
+
+    def __init__(self, db_path=PLAINTEXT_STORE_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, timeout=60, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS plaintexts (
+                accession_number TEXT NOT NULL,
+                source TEXT NOT NULL,
+                document TEXT NOT NULL,
+                doc_type TEXT,
+                parser_version TEXT NOT NULL,
+                plaintext BLOB NOT NULL,
+                tables BLOB NOT NULL,
+                offsets BLOB,
+                n_chars INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (accession_number, source, document)
+            )
+            """
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(plaintexts)")}
+        if "offsets" not in columns:
+            # Stores created before offset maps were recorded
+            self._db.execute("ALTER TABLE plaintexts ADD COLUMN offsets BLOB")
+        self._db.commit()
+
+    def get_filing(self, accession_number, source, parser_version):
+        """
+        Return the PreparedDocuments stored for a fetched file, or None
+        when nothing was stored by this parser version.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT document, doc_type, parser_version, plaintext, tables, offsets "
+                "FROM plaintexts WHERE accession_number = ? AND source = ? "
+                "ORDER BY rowid",
+                (accession_number, source),
+            ).fetchall()
+
+        if not rows or any(row[2] != parser_version for row in rows):
+            return None
+
+        try:
+            return [
+                PreparedDocument(
+                    document,
+                    doc_type,
+                    zlib.decompress(plaintext).decode("utf-8"),
+                    json.loads(zlib.decompress(tables)),
+                    zlib.decompress(offsets) if offsets is not None else None,
+                )
+                for document, doc_type, _, plaintext, tables, offsets in rows
+            ]
+        except (zlib.error, UnicodeDecodeError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable plaintext for {accession_number}: {e}")
+            return None
+
+    def put_filing(self, accession_number, source, documents, parser_version):
+        """
+        Replace everything stored for a fetched file with `documents`.
+        """
+        now = time.time()
+        rows = [
+            (
+                accession_number,
+                source,
+                doc.document,
+                doc.doc_type,
+                parser_version,
+                zlib.compress(doc.plaintext.encode("utf-8"), 6),
+                zlib.compress(json.dumps(doc.tables, ensure_ascii=False).encode("utf-8"), 6),
+                zlib.compress(doc.offsets, 6) if doc.offsets is not None else None,
+                len(doc.plaintext),
+                now,
+            )
+            for doc in documents
+        ]
+
+        with self._lock:
+            with self._db:
+                self._db.execute(
+                    "DELETE FROM plaintexts WHERE accession_number = ? AND source = ?",
+                    (accession_number, source),
+                )
+                self._db.executemany(
+                    "INSERT INTO plaintexts "
+                    "(accession_number, source, document, doc_type, parser_version, "
+                    "plaintext, tables, offsets, n_chars, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+
+    def close(self):
+        self._db.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_plaintext_store() -> PlaintextStore:
+    """
+    Return the process-wide PlaintextStore, creating it on first use.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PlaintextStore()
+        return _store
+
+
+def reset_plaintext_store():
+    """
+    Forget the process-wide PlaintextStore without closing it, so the next
+    get_plaintext_store opens a connection owned by this process. Worker
+    processes call it at start-up: SQLite connections must not be shared
+    across processes.
+    """
+    global _store, _store_lock
+    _store = None
+    _store_lock = threading.Lock()
@@ -0,0 +1,252 @@
+# data_access/raw_cache.py
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from config.settings import RAW_CACHE_DIR, RAW_CACHE_MAX_BYTES, RAW_CACHE_LOW_WATER
+
+logger = logging.getLogger(__name__)
+
+
+class RawDocumentCache:
+    """
+    Persistent, content-addressed cache of raw filing documents.
+
+    Documents are looked up by (accession number, document name) and
+    stored once per SHA-256 of their bytes, zlib-compressed, under
+    `blobs/`. A SQLite index tracks last access so the cache can be held
+    under `max_bytes` by evicting least-recently-used documents. Eviction
+    goes down to `low_water` of the cap, so it runs once per batch of
+    puts rather than on every put at the cap.
+    """
+
+    # Victims fetched per eviction query
+    _EVICT_BATCH = 256
+
+    def __init__(
+        self,
+        cache_dir=RAW_CACHE_DIR,
+        max_bytes=RAW_CACHE_MAX_BYTES,
+        low_water=RAW_CACHE_LOW_WATER,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.low_water_bytes = int(max_bytes * low_water)
+        self.blob_dir = os.path.join(cache_dir, "blobs")
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            os.path.join(cache_dir, "index.sqlite"), check_same_thread=False
+        )
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                accession_number TEXT NOT NULL,
+                document TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                encoding TEXT,
+                raw_size INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (accession_number, document)
+            );
+            CREATE INDEX IF NOT EXISTS documents_last_access
+                ON documents (last_access);
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                stored_size INTEGER NOT NULL
+            );
+            """
+        )
+        self._db.commit()
+
+    def _blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], f"{digest}.zz")
+
+    # ==========================================================
+    # Public API
+    # ==========================================================
+
+    def get(self, accession_number, document):
+        """
+        Return (content bytes, encoding) for a cached document, or None.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT digest, encoding FROM documents "
+                "WHERE accession_number = ? AND document = ?",
+                (accession_number, document),
+            ).fetchone()
+            if row is None:
+                return None
+
+            digest, encoding = row
+            try:
+                with open(self._blob_path(digest), "rb") as f:
+                    content = zlib.decompress(f.read())
+            except (OSError, zlib.error) as e:
+                logger.warning(f"Dropping unreadable cache entry {digest}: {e}")
+                self._forget(accession_number, document)
+                self._db.commit()
+                return None
+
+            self._db.execute(
+                "UPDATE documents SET last_access = ? "
+                "WHERE accession_number = ? AND document = ?",
+                (time.time(), accession_number, document),
+            )
+            self._db.commit()
+
+        return content, encoding
+
+    def put(self, accession_number, document, content, encoding=None):
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(digest)
+
+        with self._lock:
+            known = self._db.execute(
+                "SELECT 1 FROM blobs WHERE digest = ?", (digest,)
+            ).fetchone()
+
+        # Compress outside the lock so fetch threads do it in parallel. The
+        # blob is looked up again below: another thread may have stored it,
+        # or evicted it, in the meantime
+        payload = zlib.compress(content, 6) if known is None else None
+
+        with self._lock:
+            known = self._db.execute(
+                "SELECT 1 FROM blobs WHERE digest = ?", (digest,)
+            ).fetchone()
+
+            if known is None:
+                if payload is None:
+                    payload = zlib.compress(content, 6)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)
+                self._db.execute(
+                    "INSERT INTO blobs (digest, stored_size) VALUES (?, ?)",
+                    (digest, len(payload)),
+                )
+
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents "
+                "(accession_number, document, digest, encoding, raw_size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (accession_number, document, digest, encoding, len(content), time.time()),
+            )
+            self._db.commit()
+            self._evict()
+
+    def size(self):
+        with self._lock:
+            return self._stored_bytes()
+
+    def raw_sizes(self, accession_numbers):
+        """
+        {accession number: size in bytes of its largest cached document}
+        for the accessions the cache has seen.
+        """
+        accession_numbers = list(accession_numbers)
+        sizes = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(accession_numbers), 900):
+                chunk = accession_numbers[i:i + 900]
+                rows = self._db.execute(
+                    "SELECT accession_number, MAX(raw_size) FROM documents "
+                    f"WHERE accession_number IN ({', '.join('?' * len(chunk))}) "
+                    "GROUP BY accession_number",
+                    chunk,
+                )
+                sizes.update(rows.fetchall())
+        return sizes
+
+    # ==========================================================
+    # Eviction
+    # ==========================================================
+
+    def _stored_bytes(self):
+        return self._db.execute(
+            "SELECT COALESCE(SUM(stored_size), 0) FROM blobs"
+        ).fetchone()[0]
+
+    def _evict(self):
+        total = self._stored_bytes()
+        if total <= self.max_bytes:
+            return
+
+        evicted = 0
+        while total > self.low_water_bytes:
+            victims = self._db.execute(
+                "SELECT accession_number, document FROM documents "
+                "ORDER BY last_access LIMIT ?",
+                (self._EVICT_BATCH,),
+            ).fetchall()
+            if not victims:
+                break
+
+            for accession_number, document in victims:
+                if total <= self.low_water_bytes:
+                    break
+                total -= self._forget(accession_number, document)
+                evicted += 1
+
+        self._db.commit()
+        logger.info(f"Raw cache evicted {evicted} documents ({total:,} bytes kept)")
+
+    def _forget(self, accession_number, document):
+        """
+        Drop one index entry and its blob once nothing references it.
+        Returns the number of bytes freed on disk.
+        """
+        row = self._db.execute(
+            "SELECT digest FROM documents WHERE accession_number = ? AND document = ?",
+            (accession_number, document),
+        ).fetchone()
+        if row is None:
+            return 0
+
+        digest = row[0]
+        self._db.execute(
+            "DELETE FROM documents WHERE accession_number = ? AND document = ?",
+            (accession_number, document),
+        )
+
+        still_used = self._db.execute(
+            "SELECT 1 FROM documents WHERE digest = ? LIMIT 1", (digest,)
+        ).fetchone()
+        if still_used:
+            return 0
+
+        stored = self._db.execute(
+            "SELECT stored_size FROM blobs WHERE digest = ?", (digest,)
+        ).fetchone()
+        self._db.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+        try:
+            os.remove(self._blob_path(digest))
+        except FileNotFoundError:
+            pass
+
+        return stored[0] if stored else 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_raw_cache() -> RawDocumentCache:
+    """
+    Return the process-wide RawDocumentCache, creating it on first use.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = RawDocumentCache()
+        return _cache
@@ -1,20 +1,529 @@
 # data_access/sec_client.py
-import requests
-import time
+import asyncio
+import json
 import logging
-from config.settings import HEADERS
+import threading
+import time
+from concurrent.futures import wait, FIRST_COMPLETED
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from config.settings import (
+    HEADERS,
+    SEC_MAX_REQUESTS_PER_SECOND,
+    SEC_RATE_LIMIT_BURST,
+    SEC_MAX_CONNECTIONS,
+    SEC_INITIAL_CONCURRENCY,
+    SEC_REQUEST_TIMEOUT,
+    MAX_DOCUMENT_BYTES,
+    SEC_HTTP_MODE,
+    SEC_BASE_URL_OVERRIDE,
+)
+from .fixtures import FixtureStore
 
 logger = logging.getLogger(__name__)
 
-def safe_get(url, retries=3, sleep=0.5):
-    for attempt in range(retries):
-        try:
-            resp = requests.get(url, headers={"User-Agent": HEADERS}, timeout=30)
-            if resp.status_code == 200:
-                return resp
-            logger.warning(f"HTTP {resp.status_code} for {url}")
-        except Exception as e:
-            logger.warning(f"Request error ({attempt+1}/{retries}): {e}")
-        time.sleep(sleep)
-    logger.error(f"Failed to fetch URL after {retries} attempts: {url}")
-    return None
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter living on the client event loop.
+    Every request in the process draws one token, so all workers
+    together stay under `rate` requests per second.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class HostConcurrency:
+    """
+    AIMD controller for in-flight requests to one host.
+
+    Every healthy response grows the limit by 1/limit (about +1 per full
+    window), a throttled response halves it (at most once per second, so a
+    burst of 429s counts as one congestion event), and Retry-After pauses
+    new requests to the host until it has elapsed.
+    """
+
+    def __init__(self, name, initial=2, minimum=1, maximum=10, decrease=0.5):
+        self.name = name
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._last_decrease = 0.0
+        self._changed = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._changed:
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                try:
+                    await asyncio.wait_for(
+                        self._changed.wait(), timeout=pause if pause > 0 else None
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def release(self, outcome):
+        """
+        `outcome` is "ok", "throttled" or "error" (no limit change).
+        Returns the limit after the change.
+        """
+        async with self._changed:
+            self.in_flight -= 1
+            now = time.monotonic()
+
+            if outcome == "ok":
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            elif outcome == "throttled" and now - self._last_decrease > 1:
+                self.limit = max(self.minimum, self.limit * self.decrease)
+                self._last_decrease = now
+
+            self._changed.notify_all()
+            return self.limit
+
+
+def _retry_after(value):
+    """
+    Parse a Retry-After header (delta-seconds or HTTP-date) into seconds.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class SecResponse:
+    """
+    Fully-read HTTP response, detached from the connection so it can be
+    handed back to any thread.
+    """
+
+    def __init__(self, url, status_code, headers, content, encoding=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class SecClient:
+    """
+    Process-wide asyncio EDGAR client.
+
+    Owns a background event loop with one keep-alive connection pool and
+    one token bucket. Coroutines use `fetch`; threaded callers use `get`,
+    which schedules the request on the loop and waits for the result.
+
+    `mode="record"` saves every 200 response to a FixtureStore and
+    `mode="replay"` serves only from it, never touching the network.
+    `base_url` reroutes requests to a stand-in server (see fake_edgar),
+    which receives the original host as the first path segment.
+    """
+
+    def __init__(
+        self,
+        user_agent=HEADERS,
+        max_requests_per_second=SEC_MAX_REQUESTS_PER_SECOND,
+        burst=SEC_RATE_LIMIT_BURST,
+        max_connections=SEC_MAX_CONNECTIONS,
+        initial_concurrency=SEC_INITIAL_CONCURRENCY,
+        timeout=SEC_REQUEST_TIMEOUT,
+        mode=SEC_HTTP_MODE,
+        fixtures=None,
+        base_url=SEC_BASE_URL_OVERRIDE,
+    ):
+        if mode not in ("live", "record", "replay"):
+            raise ValueError(f"Unknown SEC_HTTP_MODE: {mode}")
+
+        self.user_agent = user_agent
+        self.max_requests_per_second = max_requests_per_second
+        self.burst = burst
+        self.max_connections = max_connections
+        self.initial_concurrency = initial_concurrency
+        self.timeout = timeout
+        self.mode = mode
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self.fixtures = fixtures
+        if mode != "live" and fixtures is None:
+            self.fixtures = FixtureStore()
+
+        self.loop = None
+        self._thread = None
+        self._session = None
+        self._limiter = None
+        self._hosts = {}
+        self._start_lock = threading.Lock()
+
+    # ==========================================================
+    # Lifecycle
+    # ==========================================================
+
+    def start(self):
+        with self._start_lock:
+            if self.loop is not None:
+                return
+
+            self.loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self.loop.run_forever, name="sec-client", daemon=True
+            )
+            self._thread.start()
+            asyncio.run_coroutine_threadsafe(self._open(), self.loop).result()
+
+            logger.info(
+                f"SEC client started | mode={self.mode} | "
+                f"{self.max_requests_per_second} req/s | "
+                f"{self.max_connections} pooled connections"
+            )
+
+    async def _open(self):
+        self._limiter = TokenBucket(self.max_requests_per_second, self.burst)
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            keepalive_timeout=60,
+            ttl_dns_cache=300,
+        )
+        headers = {"Accept-Encoding": "gzip, deflate"}
+        if self.user_agent:
+            headers["User-Agent"] = self.user_agent
+
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers=headers,
+            # Like requests' timeout: bounds connecting and each read, not
+            # the whole body, so a large document may take as long as it needs
+            timeout=aiohttp.ClientTimeout(
+                total=None, sock_connect=self.timeout, sock_read=self.timeout
+            ),
+        )
+
+    def close(self):
+        if self.loop is None:
+            return
+
+        asyncio.run_coroutine_threadsafe(self._session.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+        self.loop = None
+
+    # ==========================================================
+    # Requests
+    # ==========================================================
+
+    def _resolve(self, url):
+        if self.base_url is None:
+            return url
+        parts = urlsplit(url)
+        query = f"?{parts.query}" if parts.query else ""
+        return f"{self.base_url}/{parts.netloc}{parts.path}{query}"
+
+    def _replay(self, url):
+        recorded = self.fixtures.load(url)
+        if recorded is None:
+            logger.error(f"No recorded fixture for {url}")
+            return None
+
+        meta, body = recorded
+        return SecResponse(
+            url=url,
+            status_code=meta["status_code"],
+            headers=meta["headers"],
+            content=body,
+            encoding=meta["encoding"],
+        )
+
+    def _recorded(self, response):
+        if self.mode == "record" and response.status_code == 200:
+            self.fixtures.save(response)
+        return response
+
+    async def _request(self, url, reader, headers=None, retries=3, sleep=0.5):
+        """
+        Shared retry loop. `reader(resp)` turns an accepted response into a
+        SecResponse, returns None to reject it, or returns False to retry.
+
+        Each attempt takes a token from the global bucket and a slot from
+        the host's AIMD controller. Throttling (429/503) shrinks the host's
+        concurrency and honours Retry-After; the wait happens on the event
+        loop with the slot released, so it blocks neither a connection nor
+        other requests.
+        """
+        if self.mode == "replay":
+            return self._replay(url)
+
+        netloc = urlsplit(url).netloc
+        host = self._hosts.get(netloc)
+        if host is None:
+            host = self._hosts[netloc] = HostConcurrency(
+                netloc,
+                initial=self.initial_concurrency,
+                maximum=self.max_connections,
+            )
+
+        for attempt in range(retries):
+            delay = sleep * 2 ** attempt
+            await host.acquire()
+            await self._limiter.acquire()
+            outcome = "error"
+            try:
+                async with self._session.get(self._resolve(url), headers=headers) as resp:
+                    if resp.status in (429, 503):
+                        outcome = "throttled"
+                        status = resp.status
+                        delay = _retry_after(resp.headers.get("Retry-After")) or delay
+                        host.pause(delay)
+                    else:
+                        result = await reader(resp)
+                        outcome = "ok"
+                        if result is not False:
+                            return self._recorded(result) if result else None
+                        logger.warning(f"HTTP {resp.status} for {url}")
+            except Exception as e:
+                logger.warning(f"Request error ({attempt+1}/{retries}): {e}")
+            finally:
+                limit = await host.release(outcome)
+            if outcome == "throttled":
+                # Logged after release, so it shows the decreased limit
+                logger.warning(
+                    f"HTTP {status} for {url}; host {host.name} "
+                    f"concurrency now {limit:.1f}, retrying in {delay:.1f}s"
+                )
+            await asyncio.sleep(delay)
+
+        logger.error(f"Failed to fetch URL after {retries} attempts: {url}")
+        return None
+
+    async def fetch(self, url, retries=3, sleep=0.5, headers=None):
+        """
+        GET `url` through the shared pool and limiter.
+        Returns a SecResponse for HTTP 200 (or 304 when conditional
+        `headers` were sent), otherwise None.
+        """
+        async def read(resp):
+            if resp.status == 200 or (resp.status == 304 and headers):
+                return SecResponse(
+                    url=url,
+                    status_code=resp.status,
+                    headers=dict(resp.headers),
+                    content=await resp.read(),
+                    encoding=resp.charset,
+                )
+            return False
+
+        return await self._request(url, read, headers=headers, retries=retries, sleep=sleep)
+
+    async def fetch_document(
+        self,
+        url,
+        max_bytes=MAX_DOCUMENT_BYTES,
+        retries=3,
+        sleep=0.5,
+        make_filter=None,
+    ):
+        """
+        Stream a filing document chunk by chunk instead of buffering the
+        whole body in the connection. Bodies over `max_bytes` are
+        abandoned without retry. Returns a SecResponse whose `content` is
+        the raw bytes and `encoding` the declared charset (or None).
+
+        `make_filter` builds a fresh chunk filter per attempt (an object with
+        `feed(chunk) -> bytes` and `close() -> bytes`); only the bytes it
+        keeps are buffered and counted against `max_bytes`. Fixtures always
+        hold the document as served: record and replay modes filter it once
+        it is read.
+        """
+        stream_filter = make_filter if self.mode == "live" else None
+
+        async def read(resp):
+            if resp.status != 200:
+                return False
+
+            chunk_filter = stream_filter() if stream_filter else None
+            if chunk_filter is None and (resp.content_length or 0) > max_bytes:
+                logger.error(f"Document too large ({resp.content_length:,} bytes): {url}")
+                return None
+
+            content = await self._read_capped(resp, max_bytes, chunk_filter)
+            if content is None:
+                logger.error(f"Document exceeded {max_bytes:,} bytes: {url}")
+                return None
+
+            return SecResponse(
+                url=url,
+                status_code=resp.status,
+                headers=dict(resp.headers),
+                content=content,
+                encoding=resp.charset,
+            )
+
+        response = await self._request(url, read, retries=retries, sleep=sleep)
+        if response is not None and make_filter and stream_filter is None:
+            chunk_filter = make_filter()
+            response.content = chunk_filter.feed(response.content) + chunk_filter.close()
+        return response
+
+    @staticmethod
+    async def _read_capped(resp, max_bytes, chunk_filter=None):
+        """
+        Body bytes, or None past `max_bytes`. Chunks are joined once at the
+        end, so the document is copied a single time.
+        """
+        chunks = []
+        kept = 0
+        async for chunk in resp.content.iter_chunked(1 << 16):
+            if chunk_filter is not None:
+                chunk = chunk_filter.feed(chunk)
+            kept += len(chunk)
+            if kept > max_bytes:
+                return None
+            chunks.append(chunk)
+
+        if chunk_filter is not None:
+            chunks.append(chunk_filter.close())
+        return b"".join(chunks)
+
+    def get(self, url, retries=3, sleep=0.5, headers=None):
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(
+            self.fetch(url, retries=retries, sleep=sleep, headers=headers), self.loop
+        )
+        return future.result()
+
+    def get_document(
+        self, url, max_bytes=MAX_DOCUMENT_BYTES, retries=3, sleep=0.5, make_filter=None
+    ):
+        return self.submit_document(
+            url, max_bytes=max_bytes, retries=retries, sleep=sleep, make_filter=make_filter
+        ).result()
+
+    def submit_document(
+        self, url, max_bytes=MAX_DOCUMENT_BYTES, retries=3, sleep=0.5, make_filter=None
+    ):
+        """
+        Schedule `fetch_document` on the loop and return its
+        concurrent.futures.Future without waiting. Retry and Retry-After
+        sleeps then happen on the loop alone, holding no caller thread.
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(
+            self.fetch_document(
+                url,
+                max_bytes=max_bytes,
+                retries=retries,
+                sleep=sleep,
+                make_filter=make_filter,
+            ),
+            self.loop,
+        )
+
+    def iter_get(self, urls, window=None, retries=3, sleep=0.5, headers=None):
+        """
+        Fetch many URLs concurrently, yielding (url, response) pairs in
+        completion order. At most `window` requests are queued on the loop
+        at once; the token bucket still paces what goes on the wire.
+        `headers` optionally maps a URL to extra request headers.
+        """
+        self.start()
+        window = window or self.max_connections * 2
+        headers = headers or {}
+        urls = iter(urls)
+        pending = {}
+
+        def submit_next():
+            url = next(urls, None)
+            if url is None:
+                return False
+            future = asyncio.run_coroutine_threadsafe(
+                self.fetch(url, retries=retries, sleep=sleep, headers=headers.get(url)),
+                self.loop,
+            )
+            pending[future] = url
+            return True
+
+        while len(pending) < window and submit_next():
+            pass
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                url = pending.pop(future)
+                submit_next()
+                yield url, future.result()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> SecClient:
+    """
+    Return the process-wide SecClient, creating it on first use.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = SecClient()
+        return _client
+
+
+def safe_get(url, retries=3, sleep=0.5, headers=None):
+    return get_client().get(url, retries=retries, sleep=sleep, headers=headers)
+
+
+def stream_get(url, max_bytes=MAX_DOCUMENT_BYTES, retries=3, sleep=0.5, make_filter=None):
+    return get_client().get_document(
+        url, max_bytes=max_bytes, retries=retries, sleep=sleep, make_filter=make_filter
+    )
+
+
+def submit_stream_get(url, max_bytes=MAX_DOCUMENT_BYTES, retries=3, sleep=0.5, make_filter=None):
+    return get_client().submit_document(
+        url, max_bytes=max_bytes, retries=retries, sleep=sleep, make_filter=make_filter
+    )
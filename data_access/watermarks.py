@@ -0,0 +1,114 @@
+# data_access/watermarks.py
+import logging
+import os
+import sqlite3
+import time
+
+from config.settings import WATERMARK_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+
+class WatermarkStore:
+    """
+    Per-CIK record of the newest accession seen in the submissions feed,
+    together with the ETag / Last-Modified validators of that response.
+
+    Updates are staged in memory and only written by `commit()`, so a run
+    that fails after fetching metadata does not advance the watermark past
+    filings it never processed. `hold_back` keeps a staged watermark below
+    the filings that failed to extract, so the next delta run lists them
+    again.
+    """
+
+    def __init__(self, db_path=WATERMARK_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._db = sqlite3.connect(db_path)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS watermarks (
+                cik TEXT PRIMARY KEY,
+                last_accession TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.commit()
+        self._pending = {}
+
+    def get(self, cik):
+        """
+        Return {"last_accession", "etag", "last_modified"} for a CIK, or None.
+        """
+        row = self._db.execute(
+            "SELECT last_accession, etag, last_modified FROM watermarks WHERE cik = ?",
+            (cik,),
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("last_accession", "etag", "last_modified"), row))
+
+    def conditional_headers(self, cik):
+        """
+        Build If-None-Match / If-Modified-Since headers from the stored
+        validators. Returns None when nothing is known about the CIK.
+        """
+        mark = self.get(cik)
+        if mark is None:
+            return None
+
+        headers = {}
+        if mark["etag"]:
+            headers["If-None-Match"] = mark["etag"]
+        if mark["last_modified"]:
+            headers["If-Modified-Since"] = mark["last_modified"]
+        return headers or None
+
+    def stage(self, cik, last_accession, etag=None, last_modified=None, accessions=()):
+        """
+        Stage a new watermark. `accessions` are the CIK's new filings,
+        newest first, followed by the previous watermark if known.
+        """
+        self._pending[cik] = (last_accession, etag, last_modified, list(accessions))
+
+    def hold_back(self, failed):
+        """
+        Move each staged watermark to just before the oldest of its new
+        filings in `failed`. The validators are dropped too, or a 304
+        would hide the held-back filings from the next run.
+        """
+        held = 0
+        for cik, (last_accession, etag, last_modified, accessions) in self._pending.items():
+            failed_at = [i for i, accession in enumerate(accessions) if accession in failed]
+            if not failed_at:
+                continue
+
+            older = failed_at[-1] + 1
+            last_accession = accessions[older] if older < len(accessions) else None
+            self._pending[cik] = (last_accession, None, None, accessions)
+            held += 1
+
+        if held:
+            logger.info(f"Held back watermarks of {held} CIKs with failed filings")
+
+    def commit(self):
+        if not self._pending:
+            return
+
+        now = time.time()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO watermarks "
+            "(cik, last_accession, etag, last_modified, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(cik, *mark[:3], now) for cik, mark in self._pending.items()],
+        )
+        self._db.commit()
+        logger.info(f"Committed watermarks for {len(self._pending)} CIKs")
+        self._pending.clear()
+
+    def close(self):
+        self._db.close()
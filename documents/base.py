@@ -38,8 +38,8 @@ class Document(metaclass=ABCMeta):
             section_start = time.process_time()
 
             section_metadata = copy.copy(self.metadata)
-            section_name = section_def["itemname"]
-            search_pairs = section_def["html"]
+            section_name = section_def.itemname
+            search_pairs = section_def.html
 
             (
                 text_extract,
@@ -0,0 +1,21 @@
+# documents/blocks.py
+"""
+Block-element rules shared by the BeautifulSoup and lxml plaintext walks.
+"""
+import re
+from functools import lru_cache
+
+BLOCK_TAGS = frozenset(
+    {"p", "div", "br", "hr", "tr", "table", "form", "h1", "h2", "h3", "h4", "h5", "h6"}
+)
+
+_MARGIN_STYLE = re.compile(r"margin-(top|bottom)")
+
+
+@lru_cache(maxsize=8192)
+def is_margin_style(style: str) -> bool:
+    """
+    Whether an inline style sets a vertical margin. Filings repeat the
+    same few style strings thousands of times, so results are cached.
+    """
+    return _MARGIN_STYLE.search(style) is not None
@@ -0,0 +1,86 @@
+# documents/heading_index.py
+import logging
+import re
+from array import array
+from bisect import bisect_left
+
+from documents.matchers import PatternTimeout, get_matcher
+
+logger = logging.getLogger(__name__)
+
+_NEWLINE = re.compile(r"\n")
+
+
+class HeadingIndex:
+    """
+    Line-start offsets of a plaintext, found in one scan, plus the heading
+    matches of each start/end regex at those offsets.
+
+    Every html search pattern begins with a newline, so a section can only
+    start or end at a line start. Each distinct regex is tried once per
+    line (anchored, never scanning), and the result is shared by all
+    sections and pairs using it. Section bounds are then chosen from the
+    sorted hit lists, so a filing costs O(document) instead of one full
+    lazy scan per pattern pair. Matching goes through `matcher`, which
+    enforces the per-pattern time budget.
+    """
+
+    def __init__(self, text, matcher=None):
+        self.text = text
+        self.matcher = matcher or get_matcher()
+        self.line_starts = array("q", [m.start() for m in _NEWLINE.finditer(text)])
+        self._hits = {}
+
+    def hits(self, regex):
+        """
+        (start, end) spans of `regex` matched at each line start, ascending.
+        """
+        spans = self._hits.get(regex)
+        if spans is None:
+            try:
+                spans = self.matcher.scan_lines(regex, self.text, self.line_starts)
+            except PatternTimeout as e:
+                spans = e
+            self._hits[regex] = spans
+
+        if isinstance(spans, PatternTimeout):
+            # Shared by several pairs: fail them all without rescanning
+            raise spans
+        return spans
+
+    def section_spans(self, pair):
+        """
+        Non-overlapping (start, end) offsets of a PatternPair's section, as
+        `pair.regex.findall` would report them: each start runs to the first
+        end heading at or after the start's own end.
+        """
+        ends = self.hits(pair.end_regex)
+        end_positions = [start for start, _ in ends]
+
+        spans = []
+        resume = 0
+        for start, start_end in self.hits(pair.start_regex):
+            if start < resume:
+                continue
+
+            i = bisect_left(end_positions, start_end)
+            if i < len(ends):
+                resume = ends[i][1]
+                spans.append((start, resume))
+            elif i and end_positions[i - 1] > start:
+                # An end heading sits inside this start's match; a shorter
+                # start alternative may still close on it, so ask the engine
+                found = self.matcher.match(pair.regex, self.text, start)
+                if found:
+                    resume = found.end()
+                    spans.append(found.span())
+        return spans
+
+    def longest_section(self, pair):
+        """
+        Offsets of the longest section (first one on ties), or None.
+        """
+        spans = self.section_spans(pair)
+        if not spans:
+            return None
+        return max(spans, key=lambda span: span[1] - span[0])
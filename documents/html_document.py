@@ -1,14 +1,65 @@
 import re
 import time
-import json
 import logging
-from statistics import median
+from functools import cached_property
 from bs4 import BeautifulSoup, NavigableString, Comment
 
 from documents.base import Document
+from documents import lxml_plaintext, tables
+from documents.blocks import BLOCK_TAGS, is_margin_style
+from documents.heading_index import HeadingIndex
+from documents.html_slimmer import slim_html
+from documents.matchers import PatternTimeout, get_matcher
+from documents.offset_map import EditLog, OffsetMap, range_covers
+from config.settings import HTML_SLIMMING_ENABLED, RECORD_SOURCE_OFFSETS
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever prepare_text output changes
+_PREPARE_REVISION = 3
+# Stamp on stored plaintext, and part of the manifest version. Settings that
+# change what prepare_text stores are folded in, so toggling one never
+# serves plaintext (or skips filings) prepared under the other setting
+PARSER_VERSION = (
+    f"{_PREPARE_REVISION}"
+    f"-slim{int(HTML_SLIMMING_ENABLED)}"
+    f"-offsets{int(RECORD_SOURCE_OFFSETS)}"
+)
+
+
+def _compile_both(pattern, flags=0):
+    """
+    Compile a pattern for str input and its ASCII twin for raw bytes, so
+    documents handed over undecoded can be rewritten without decoding.
+    """
+    return {
+        str: re.compile(pattern, flags),
+        bytes: re.compile(pattern.encode("ascii"), flags),
+    }
+
+
+def _sub(patterns, repl, text, edits=None):
+    if isinstance(text, bytes):
+        pattern, repl = patterns[bytes], repl.encode("ascii")
+    else:
+        pattern = patterns[str]
+    if edits is not None:
+        return edits.sub(pattern, repl, text)
+    return pattern.sub(repl, text)
+
+
+_SPACE_AFTER_LT = _compile_both(r"<\s")
+_SMALL_TAGS = _compile_both(r"(<small>|</small>)", re.IGNORECASE)
+_ITEM_LINE = _compile_both(r"(\nITEM\s{1,10}[1-9])", re.IGNORECASE)
+_DOUBLE_NEWLINE = _compile_both(r"\n\n")
+_TRAILING_WHITESPACE = _compile_both(r">\s+\Z")
+_START_TAG = _compile_both(r"<[A-Za-z]")
+
+
+def _stripped_span(text, start, end):
+    segment = text[start:end]
+    return start + len(segment) - len(segment.lstrip()), end - len(segment) + len(segment.rstrip())
+
 
 class HtmlDocument(Document):
     def __init__(
@@ -17,8 +68,16 @@ class HtmlDocument(Document):
         doc_text,
         extraction_method,
         metadata,
-        search_patterns
+        search_patterns,
+        encoding=None,
+        matcher=None,
     ):
+        """
+        `doc_text` may be a str or the raw response bytes; for bytes,
+        `encoding` is the declared charset (None lets the parser sniff it).
+        `matcher` is the regex backend (documents.matchers), REGEX_BACKEND
+        by default.
+        """
         super().__init__(
             file_path=file_path,
             doc_text=doc_text,
@@ -26,6 +85,20 @@ class HtmlDocument(Document):
             metadata=metadata,
             search_patterns=search_patterns
         )
+        self.encoding = encoding
+        self.matcher = matcher or get_matcher()
+
+        self.soup = None
+        self.root = None
+        self.plaintext = None
+        self.tables = []
+        self.offset_map = None
+        self.section_spans = {}
+        self.section_warnings = {}
+        self.pattern_timeouts = []
+        self._plain_shift = 0
+        self.n_chars = 0
+        self.n_tags = 0
 
     # ==========================================================
     # Preprocessing
@@ -33,38 +106,99 @@ class HtmlDocument(Document):
 
     def prepare_text(self):
         html_text = self.doc_text
-
-        html_text = re.sub(r"<\s", "<", html_text)
-        html_text = re.sub(r"(<small>|</small>)", "", html_text, flags=re.IGNORECASE)
-        html_text = re.sub(
-            r"(\nITEM\s{1,10}[1-9])", r"<br>\1", html_text, flags=re.IGNORECASE
-        )
+        # Raw bytes go to the parser as-is, with the declared charset
+        encoding = self.encoding if isinstance(html_text, bytes) else None
+
+        # Rewrites are logged so source offsets can be mapped back
+        edits = EditLog() if RECORD_SOURCE_OFFSETS else None
+        html_text = _sub(_SPACE_AFTER_LT, "<", html_text, edits)
+        html_text = _sub(_SMALL_TAGS, "", html_text, edits)
+        html_text = _sub(_ITEM_LINE, r"<br>\1", html_text, edits)
+
+        # Decide the paragraph rewrite from the markup itself, so the
+        # document is parsed exactly once
+        self.n_chars = len(html_text)
+        self.n_tags = len(_START_TAG[type(html_text)].findall(html_text))
+        markup_poor = self.n_chars / max(self.n_tags, 1) > 500
+        if markup_poor:
+            # Barely tagged text: blank lines become breaks, read by html.parser
+            html_text = _sub(_DOUBLE_NEWLINE, "<br>", html_text, edits)
+        elif HTML_SLIMMING_ENABLED:
+            # Inline XBRL headers and unused attributes never reach the DOM
+            html_text = slim_html(html_text, edits)
+
+        self.offset_map = OffsetMap(html_text) if RECORD_SOURCE_OFFSETS else None
 
         start_time = time.process_time()
-        try:
-            self.soup = BeautifulSoup(html_text, "lxml")
-        except Exception:
-            self.soup = BeautifulSoup(html_text, "html.parser")
+        if self.extraction_method == "lxml" and not markup_poor:
+            self._prepare_lxml(html_text, encoding)
+        else:
+            self._prepare_soup(html_text, encoding, markup_poor)
+
+        if self.offset_map is not None:
+            self.offset_map.finish(self._plain_shift, edits)
 
         parsing_time = time.process_time() - start_time
         self.log_cache.append(
             (
                 "DEBUG",
-                f"HTML parsed in {parsing_time:.2f}s | "
-                f"{len(html_text):,} chars | {len(self.soup.find_all()):,} nodes",
+                f"HTML prepared in {parsing_time:.2f}s | "
+                f"{self.n_chars:,} chars ({len(html_text):,} parsed) | {self.n_tags:,} tags",
             )
         )
 
-        if self.soup.find_all():
-            if len(html_text) / len(self.soup.find_all()) > 500:
-                html_text = re.sub(r"\n\n", "<br>", html_text)
-                self.soup = BeautifulSoup(html_text, "html.parser")
+    def _prepare_soup(self, html_text, encoding, markup_poor):
+        self.soup = None
+        if not markup_poor:
+            try:
+                self.soup = BeautifulSoup(html_text, "lxml", from_encoding=encoding)
+            except Exception:
+                pass
+        if self.soup is None:
+            self.soup = BeautifulSoup(html_text, "html.parser", from_encoding=encoding)
 
         for table in self.soup.find_all("table"):
-            if self.should_remove_table(table):
-                table.replace_with(self.table_to_json(table))
+            data = tables.scan_soup_table(table)
+            if data.is_data_table():
+                table.replace_with(tables.PLACEHOLDER.format(len(self.tables)))
+                self.tables.append(data)
+
+        self.plaintext, self._plain_shift = self._dom_to_plaintext()
+
+    def _prepare_lxml(self, html_text, encoding):
+        """
+        Same steps as the soup path, on a bare lxml tree: table
+        replacement and a single linear walk to plaintext.
+        """
+        self.root = lxml_plaintext.parse_html(html_text, encoding)
+        if self.root is None:
+            self.plaintext, self._plain_shift = "", 0
+            return
+
+        self.tables = lxml_plaintext.replace_tables(self.root)
+        self.plaintext, self._plain_shift = lxml_plaintext.lxml_to_plaintext(
+            self.root,
+            trailing_whitespace=bool(_TRAILING_WHITESPACE[type(html_text)].search(html_text)),
+            offsets=self.offset_map,
+        )
+
+    def load_prepared(self, plaintext, tables, offset_map=None):
+        """
+        Use stored prepare_text output instead of parsing `doc_text`.
+        """
+        self.plaintext = plaintext
+        self.tables = tables
+        self.offset_map = offset_map
+        self.n_chars = len(plaintext)
 
-        self.plaintext = self._dom_to_plaintext()
+    @cached_property
+    def n_nodes(self):
+        """
+        Element count of the parsed tree, traversed once on first use.
+        """
+        if self.soup is not None:
+            return len(self.soup.find_all())
+        return lxml_plaintext.count_elements(self.root)
 
     # ==========================================================
     # Public API (NEW – IMPORTANT)
@@ -75,14 +209,16 @@ class HtmlDocument(Document):
         Extract all defined sections for a filing using provided search patterns.
         """
         start_time = time.process_time()
-        self.prepare_text()
+        if self.plaintext is None:
+            self.prepare_text()
+        self.heading_index = HeadingIndex(self.plaintext, self.matcher)
 
         for section in search_patterns:
-            section_name = section.get("itemname", "unknown_section")
-            search_pairs = section.get("html", [])
+            section_name = section.itemname
+            search_pairs = section.html
 
             text, summary, start_text, end_text, warnings = self.extract_section(
-                search_pairs
+                search_pairs, section_name
             )
 
             metadata = self.metadata
@@ -90,11 +226,13 @@ class HtmlDocument(Document):
             metadata.extraction_method = self.extraction_method
             metadata.endpoints = [start_text, end_text]
             metadata.warnings = warnings
+            self.section_warnings[section_name] = warnings
             metadata.time_elapsed = round(time.process_time() - start_time, 2)
 
             if text:
                 metadata.section_n_characters = len(text)
                 self.extracted_content[section_name] = text
+                self.section_spans[section_name] = self.match_span
                 self.log_cache.append(
                     ("INFO", f"Extracted section [{section_name}] ({len(text)} chars)")
                 )
@@ -109,28 +247,44 @@ class HtmlDocument(Document):
     # Core extraction logic
     # ==========================================================
 
-    def extract_section(self, search_pairs):
+    def extract_section(self, search_pairs, section_name=None):
         start_text, end_text = None, None
         warnings = []
         text_extract = None
         longest_match = 0
+        match_span = None
 
         for pair in search_pairs:
-            pattern = pair["start"] + r"[\s\S]*?" + pair["end"]
-            matches = re.findall(pattern, self.plaintext, re.IGNORECASE | re.DOTALL)
-
-            if not matches:
+            try:
+                if pair.line_anchored:
+                    # Bounds come from the shared heading index; slice only the winner
+                    span = self.heading_index.longest_section(pair)
+                    if span is None:
+                        continue
+                    start, end = span
+                    if end - start > longest_match:
+                        text_extract = self.plaintext[start:end].strip()
+                        longest_match = end - start
+                        match_span = _stripped_span(self.plaintext, start, end)
+                else:
+                    # Precompiled and checked for capturing groups by the loader
+                    for match in self.matcher.finditer(pair.regex, self.plaintext):
+                        start, end = match.span()
+                        if end - start > longest_match:
+                            text_extract = match.group().strip()
+                            longest_match = end - start
+                            match_span = _stripped_span(self.plaintext, start, end)
+            except PatternTimeout as e:
+                # Give up on this pair only; the next one may still match
+                message = f"Pattern timed out ({self.matcher.name}): {e.pattern[:80]}"
+                warnings.append(message)
+                self.pattern_timeouts.append((section_name, message))
+                logger.warning(
+                    f"{message} | {self.metadata.form_type} "
+                    f"{self.metadata.accession_number} [{section_name}]"
+                )
                 continue
 
-            for match in matches:
-                if isinstance(match, tuple):
-                    warnings.append("Regex groups detected; please fix patterns")
-                    continue
-
-                if len(match) > longest_match:
-                    text_extract = match.strip()
-                    longest_match = len(match)
-
             if text_extract:
                 lines = text_extract.split("\n")
                 start_text = lines[0][:100]
@@ -141,6 +295,9 @@ class HtmlDocument(Document):
             warnings.append("Section extraction failed for HTML document")
             return None, "html_document_failed", None, None, warnings
 
+        # Plaintext offsets of the section, before Table of Contents removal
+        self.match_span = match_span
+
         text_extract = re.sub(
             r"\n\s{,5}Table of Contents\n",
             "",
@@ -154,47 +311,42 @@ class HtmlDocument(Document):
     # Helpers
     # ==========================================================
 
-    def should_remove_table(self, table):
-        char_lengths = [len(t) for t in table.stripped_strings if t]
-        contains_item = any(
-            re.search(r"ITEM\s*\d+[A-Z]?", t, re.IGNORECASE)
-            for t in table.stripped_strings
-        )
-
-        if not char_lengths:
-            return False
-
-        return len(char_lengths) > 5 and median(char_lengths) < 30 and not contains_item
-
-    def table_to_json(self, table):
-        rows = []
-        headers = []
-
-        header_row = table.find("tr")
-        if header_row:
-            headers = [
-                h.get_text(strip=True)
-                for h in header_row.find_all("th")
-                if h.get_text(strip=True)
-            ]
-
-        for row in table.find_all("tr"):
-            cells = [
-                c.get_text(strip=True)
-                for c in row.find_all(["td", "th"])
-                if c.get_text(strip=True)
-            ]
-            if not cells:
+    def source_ranges(self):
+        """
+        {section: (start, end)} offsets into `doc_text` (bytes for raw
+        responses) covering each extracted section, from the offset map.
+        `end` is None when the section runs to the end of the document.
+        Ranges found not to hold their section are left out.
+        """
+        if self.offset_map is None:
+            return {}
+
+        ranges = {}
+        for name, (start, end) in self.section_spans.items():
+            source_range = self.offset_map.source_range(start, end)
+            # Only checkable while the source is at hand, not for stored plaintext
+            if self.doc_text is not None and not range_covers(
+                self.doc_text, *source_range, self.plaintext[start:end]
+            ):
+                logger.warning(
+                    f"Source range {source_range} does not cover section [{name}] "
+                    f"of {self.file_path}; not recorded"
+                )
                 continue
+            ranges[name] = source_range
+        return ranges
 
-            if headers and len(headers) == len(cells):
-                rows.append(dict(zip(headers, cells)))
-            else:
-                rows.append(cells)
-
-        return json.dumps(rows, ensure_ascii=False)
+    def section_tables(self, accession_number, sections=None):
+        """
+        Columnar cells of the data tables whose placeholders fall in the
+        extracted sections (or in `sections`, name -> text, when given).
+        """
+        if sections is None:
+            sections = self.extracted_content
+        return tables.section_table_columns(accession_number, sections, self.tables)
 
     def _dom_to_plaintext(self):
+        self._td_counts = {}
         document_string = ""
         is_in_paragraph = True
         element = self.soup.find()
@@ -212,40 +364,33 @@ class HtmlDocument(Document):
                     if text:
                         if not is_in_paragraph:
                             is_in_paragraph = True
-                            document_string += text
                         else:
-                            document_string += " " + text
+                            document_string += " "
+                        if self.offset_map is not None:
+                            self.offset_map.add(len(document_string), text)
+                        document_string += text
             element = element.next_element
 
         document_string = re.sub(r"\n{3,}", "\n\n", document_string)
-        return document_string.strip()
+        stripped = document_string.strip()
+        # Leading characters removed, for the offset map
+        return stripped, len(document_string) - len(document_string.lstrip())
 
     def is_line_break(self, element):
-        block_tags = {
-            "p",
-            "div",
-            "br",
-            "hr",
-            "tr",
-            "table",
-            "form",
-            "h1",
-            "h2",
-            "h3",
-            "h4",
-            "h5",
-            "h6",
-        }
-
-        is_block = element.name in block_tags
+        name = element.name
+
+        is_block = name in BLOCK_TAGS
         if is_block and element.parent and element.parent.name == "td":
-            if len(element.parent.find_all(element.name)) == 1:
+            # Count each cell's tags once, not once per child
+            key = (id(element.parent), name)
+            count = self._td_counts.get(key)
+            if count is None:
+                count = self._td_counts[key] = len(element.parent.find_all(name))
+            if count == 1:
                 is_block = False
 
-        is_styled_block = False
-        if hasattr(element, "attrs") and "style" in element.attrs:
-            is_styled_block = bool(
-                re.search(r"margin-(top|bottom)", element["style"])
-            )
+        if is_block:
+            return True
 
-        return is_block or is_styled_block
+        attrs = getattr(element, "attrs", None)
+        return bool(attrs) and "style" in attrs and is_margin_style(attrs["style"])
@@ -0,0 +1,102 @@
+# documents/html_slimmer.py
+"""
+Markup slimming applied to filing HTML before it is parsed.
+
+Inline XBRL primary documents carry a hidden <ix:header> (contexts,
+units and hidden facts), base64 image payloads, and an inline style on
+nearly every span. None of it is useful plaintext, yet all of it is
+built into the DOM. Two linear regex passes over the raw markup drop it:
+
+- <ix:header> ... </ix:header> is removed whole;
+- start tags lose every attribute except the vertical-margin
+  declarations of `style`, the only attribute `is_line_break` reads.
+  Data-URI images go with their `src`. <meta> tags are kept as they are
+  so the declared charset is still sniffed.
+
+Both passes work on bytes or str and can log their edits, so source
+offsets still point into the document as fetched.
+"""
+import logging
+import re
+
+from documents.blocks import is_margin_style
+
+logger = logging.getLogger(__name__)
+
+_IX_HEADER = r"<ix:header\b.*?</ix:header\s*>"
+# A start tag with at least one attribute. Quoted values may hold '>';
+# anything else unusual (a stray '<') leaves the tag as it is
+_TAG_WITH_ATTRIBUTES = (
+    r"""<([A-Za-z][^\s/<>]*)((?:\s+[^\s=/<>]+(?:\s*=\s*(?:"[^"]*"|'[^']*'|[^\s<>]*))?)+)\s*/?>"""
+)
+_ATTRIBUTE = r"""([^\s=/<>]+)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s<>]*))?"""
+
+_IX_HEADER_RE = {
+    str: re.compile(_IX_HEADER, re.IGNORECASE | re.DOTALL),
+    bytes: re.compile(_IX_HEADER.encode("ascii"), re.IGNORECASE | re.DOTALL),
+}
+_TAG_RE = {
+    str: re.compile(_TAG_WITH_ATTRIBUTES),
+    bytes: re.compile(_TAG_WITH_ATTRIBUTES.encode("ascii")),
+}
+_ATTRIBUTE_RE = re.compile(_ATTRIBUTE)
+
+
+def slim_html(html_text, edits=None):
+    """
+    Return `html_text` (str or bytes) without hidden ix headers and
+    irrelevant attributes. `edits` is an optional EditLog.
+    """
+    kind = type(html_text)
+    html_text = _apply(_IX_HEADER_RE[kind], kind(), html_text, edits)
+
+    # The same few styled tags repeat thousands of times per filing
+    slimmed = {}
+
+    def slim_tag(match):
+        tag = match.group(0)
+        result = slimmed.get(tag)
+        if result is None:
+            result = slimmed[tag] = _slim_tag(match)
+        return result
+
+    return _apply(_TAG_RE[kind], slim_tag, html_text, edits)
+
+
+def _apply(pattern, repl, text, edits):
+    if edits is not None:
+        return edits.sub(pattern, repl, text)
+    return pattern.sub(repl, text)
+
+
+def _slim_tag(match):
+    tag = match.group(0)
+    if isinstance(tag, bytes):
+        # latin-1 round-trips any byte, whatever the document's charset
+        name, attributes = (group.decode("latin-1") for group in match.groups())
+        return _slim_tag_text(tag.decode("latin-1"), name, attributes).encode("latin-1")
+    return _slim_tag_text(tag, match.group(1), match.group(2))
+
+
+def _slim_tag_text(tag, name, attributes):
+    if name.lower() == "meta":
+        return tag
+
+    style = None
+    for attribute in _ATTRIBUTE_RE.finditer(attributes):
+        if attribute.group(1).lower() == "style" and attribute.group(2):
+            style = _margin_declarations(attribute.group(2))
+            break
+
+    if style is None:
+        return f"<{name}>"
+    return f"<{name} style=\"{style}\">"
+
+
+def _margin_declarations(value):
+    if value[0] in "\"'":
+        value = value[1:-1]
+    if not is_margin_style(value):
+        return None
+    declarations = [d.strip() for d in value.split(";") if is_margin_style(d)]
+    return ";".join(declarations).replace('"', "'")
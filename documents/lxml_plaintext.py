@@ -0,0 +1,204 @@
+# documents/lxml_plaintext.py
+"""
+lxml-native counterpart of HtmlDocument's BeautifulSoup pipeline.
+
+The tree is walked once, iteratively, in the same document order as
+BeautifulSoup's `next_element` chain (element, its text, its children,
+its tail), and text is appended to a list that is joined at the end, so
+conversion is linear in document size. Paragraph semantics match
+`HtmlDocument._dom_to_plaintext` exactly, including its handling of the
+final node.
+"""
+import logging
+import re
+
+from bs4 import UnicodeDammit
+from lxml import etree
+
+from documents import tables
+from documents.blocks import BLOCK_TAGS, is_margin_style
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_EXCESS_NEWLINES = re.compile(r"\n{3,}")
+
+# Node kinds yielded by _iter_nodes
+_ELEMENT, _TEXT, _OTHER = 0, 1, 2
+
+
+def parse_html(html_text, encoding=None):
+    """
+    Parse str or raw bytes into an lxml root element (None when empty).
+
+    lxml always receives bytes with an explicit encoding: undeclared
+    bytes are sniffed the way BeautifulSoup does it, and str input is
+    re-encoded as UTF-8 (lxml rejects str carrying an XML declaration).
+    """
+    if isinstance(html_text, str):
+        html_bytes, encoding = html_text.encode("utf-8"), "utf-8"
+    else:
+        html_bytes = html_text
+        if encoding is None:
+            encoding = UnicodeDammit(html_bytes, is_html=True).original_encoding
+
+    parser = etree.HTMLParser(encoding=encoding)
+    try:
+        return etree.fromstring(html_bytes, parser)
+    except etree.XMLSyntaxError:
+        # Empty or unparseable document
+        return None
+
+
+def count_elements(root) -> int:
+    if root is None:
+        return 0
+    return sum(1 for _ in root.iter(etree.Element))
+
+
+# ==========================================================
+# Tables
+# ==========================================================
+
+def replace_tables(root) -> list:
+    """
+    Replace data tables by `[[TABLE:n]]` placeholders, in place, and
+    return their TableData in ordinal order. The placeholder goes into a
+    <span> so it stays a text node of its own.
+    """
+    data_tables = []
+    for table in list(root.iter("table")):
+        parent = table.getparent()
+        if parent is None:
+            continue
+
+        data = tables.scan_lxml_table(table)
+        if not data.is_data_table():
+            continue
+
+        replacement = etree.Element("span")
+        replacement.text = tables.PLACEHOLDER.format(len(data_tables))
+        replacement.tail = table.tail
+        parent.replace(table, replacement)
+        data_tables.append(data)
+    return data_tables
+
+
+# ==========================================================
+# Plaintext conversion
+# ==========================================================
+
+def lxml_to_plaintext(root, trailing_whitespace=False, offsets=None):
+    """
+    Return (plaintext, number of leading characters stripped).
+
+    `trailing_whitespace` says the source ends in whitespace after its
+    last tag. BeautifulSoup keeps that as a final string node, which lxml
+    drops, so the real last node is then not the one to discard.
+    Text runs are anchored in `offsets` (an OffsetMap) when given.
+    """
+    pieces = []
+    append = pieces.append
+    is_in_paragraph = True
+    td_counts = {}
+    length = 0
+
+    nodes = _iter_nodes(root)
+    current = next(nodes, None)
+
+    while current is not None:
+        following = next(nodes, None)
+        kind, value = current
+
+        # The final node always closes the paragraph, as in the soup walk
+        is_last = following is None and not trailing_whitespace
+        if is_last or (kind == _ELEMENT and is_line_break(value, td_counts)):
+            if is_in_paragraph:
+                is_in_paragraph = False
+                append("\n\n")
+                length += 2
+        elif kind == _TEXT:
+            text = _WHITESPACE.sub(" ", value.strip())
+            if text:
+                if not is_in_paragraph:
+                    is_in_paragraph = True
+                else:
+                    append(" ")
+                    length += 1
+                if offsets is not None:
+                    offsets.add(length, text)
+                append(text)
+                length += len(text)
+
+        current = following
+
+    if trailing_whitespace and is_in_paragraph:
+        append("\n\n")
+
+    document_string = _EXCESS_NEWLINES.sub("\n\n", "".join(pieces))
+    return document_string.strip(), len(document_string) - len(document_string.lstrip())
+
+
+def is_line_break(element, td_counts) -> bool:
+    """
+    `td_counts` memoizes, per (cell, tag), how many such tags the cell
+    holds, so each cell subtree is counted once per tag name.
+    """
+    name = element.tag
+
+    if name in BLOCK_TAGS:
+        parent = element.getparent()
+        if parent is None or parent.tag != "td":
+            return True
+        # A lone block inside a cell does not break the line
+        key = (parent, name)
+        count = td_counts.get(key)
+        if count is None:
+            count = td_counts[key] = sum(1 for _ in parent.iter(name))
+        if count != 1:
+            return True
+
+    style = element.get("style")
+    return style is not None and is_margin_style(style)
+
+
+def _iter_nodes(root):
+    """
+    Yield (kind, value) in BeautifulSoup `next_element` order, starting at
+    `root` and continuing through the comments after it.
+    """
+    yield _ELEMENT, root
+    if root.text:
+        yield _TEXT, root.text
+
+    stack = [(root, iter(root))]
+    while stack:
+        element, children = stack[-1]
+        child = next(children, None)
+
+        if child is None:
+            stack.pop()
+            if stack and element.tail:
+                yield _TEXT, element.tail
+            continue
+
+        if not isinstance(child.tag, str):
+            # Comment or processing instruction: a node, but not text
+            yield _OTHER, None
+            if child.tail:
+                yield _TEXT, child.tail
+            continue
+
+        yield _ELEMENT, child
+        if child.text:
+            yield _TEXT, child.text
+        stack.append((child, iter(child)))
+
+    if root.tail:
+        yield _TEXT, root.tail
+    sibling = root.getnext()
+    while sibling is not None:
+        yield _OTHER, None
+        if sibling.tail:
+            yield _TEXT, sibling.tail
+        sibling = sibling.getnext()
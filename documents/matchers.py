@@ -0,0 +1,173 @@
+# documents/matchers.py
+"""
+Regex engine backends for section extraction, each enforcing a time
+budget per pattern and document.
+
+"re" (stdlib) arms a SIGALRM watchdog for the budget; the stdlib engine
+polls for signals while it backtracks, so even a single runaway call is
+interrupted. Signals only reach the main thread (which is where parse
+worker processes run), so threaded callers fall back to checks between
+the anchored line matches of the heading index. "regex" (the third-party
+`regex` package) passes the remaining budget to every call as a hard
+timeout, in any thread.
+
+A pattern that runs out of budget raises PatternTimeout. The caller
+reports it and moves on to the next pattern pair.
+"""
+import logging
+import signal
+import threading
+import time
+
+try:
+    import regex as regex_module
+except ImportError:
+    regex_module = None
+
+from config.settings import REGEX_BACKEND, REGEX_TIME_BUDGET
+
+logger = logging.getLogger(__name__)
+
+# Lines matched between two budget checks
+_CHECK_EVERY = 256
+
+
+class PatternTimeout(Exception):
+    def __init__(self, pattern, budget):
+        super().__init__(f"Pattern exceeded its {budget}s budget: {pattern[:80]}")
+        self.pattern = pattern
+        self.budget = budget
+
+
+class _Expired(Exception):
+    """
+    Raised by the watchdog's SIGALRM handler inside the running match.
+    """
+
+
+class StdlibMatcher:
+    name = "re"
+
+    def __init__(self, time_budget=REGEX_TIME_BUDGET):
+        self.time_budget = time_budget
+
+    def scan_lines(self, regex, text, line_starts):
+        """
+        (start, end) spans of `regex` matched at each line start, ascending.
+        """
+        match = self._compile(regex).match
+
+        def scan(call, deadline):
+            spans = []
+            for n, pos in enumerate(line_starts):
+                found = call(match, text, pos)
+                if found:
+                    spans.append(found.span())
+                if not n % _CHECK_EVERY and time.perf_counter() > deadline:
+                    raise PatternTimeout(regex.pattern, self.time_budget)
+            return spans
+
+        return self._bounded(regex, scan)
+
+    def match(self, regex, text, pos=0):
+        match = self._compile(regex).match
+        return self._bounded(regex, lambda call, deadline: call(match, text, pos))
+
+    def finditer(self, regex, text):
+        """
+        Every match of `regex` in `text`, as a list of match objects
+        collected within the budget.
+        """
+        finditer = self._compile(regex).finditer
+        return self._bounded(regex, lambda call, deadline: call(_collect, finditer, text))
+
+    def _compile(self, regex):
+        return regex
+
+    def _bounded(self, regex, work):
+        """
+        Run `work(call, deadline)` within the budget, where `call(method,
+        *args)` invokes one regex method.
+        """
+        deadline = time.perf_counter() + self.time_budget
+        if not _can_alarm():
+            return work(_call, deadline)
+
+        armed = [True]
+
+        def on_alarm(signum, frame):
+            if armed[0]:
+                raise _Expired
+
+        previous = signal.signal(signal.SIGALRM, on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, self.time_budget)
+        try:
+            result = work(_call, deadline)
+            armed[0] = False
+            return result
+        except _Expired:
+            raise PatternTimeout(regex.pattern, self.time_budget) from None
+        finally:
+            armed[0] = False
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            if previous is not None:
+                signal.signal(signal.SIGALRM, previous)
+
+
+class RegexModuleMatcher(StdlibMatcher):
+    name = "regex"
+
+    def __init__(self, time_budget=REGEX_TIME_BUDGET):
+        if regex_module is None:
+            raise ImportError("REGEX_BACKEND='regex' requires the `regex` package")
+        super().__init__(time_budget)
+        self._compiled = {}
+
+    def _compile(self, regex):
+        compiled = self._compiled.get(regex)
+        if compiled is None:
+            compiled = regex_module.compile(regex.pattern, regex.flags)
+            self._compiled[regex] = compiled
+        return compiled
+
+    def _bounded(self, regex, work):
+        deadline = time.perf_counter() + self.time_budget
+
+        def call(method, *args):
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise PatternTimeout(regex.pattern, self.time_budget)
+            try:
+                return method(*args, timeout=remaining)
+            except TimeoutError:
+                raise PatternTimeout(regex.pattern, self.time_budget) from None
+
+        return work(call, deadline)
+
+
+def _call(method, *args):
+    return method(*args)
+
+
+def _collect(finditer, text, **timeout):
+    # Matches are found while iterating, so iterate inside the budgeted call
+    return list(finditer(text, **timeout))
+
+
+def _can_alarm():
+    return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+
+_BACKENDS = {
+    StdlibMatcher.name: StdlibMatcher,
+    RegexModuleMatcher.name: RegexModuleMatcher,
+}
+
+
+def get_matcher(backend=REGEX_BACKEND, time_budget=REGEX_TIME_BUDGET):
+    try:
+        return _BACKENDS[backend](time_budget)
+    except KeyError:
+        raise ValueError(
+            f"Unknown regex backend {backend!r}; expected one of {', '.join(_BACKENDS)}"
+        ) from None
@@ -1,10 +1,12 @@
 import json
 import logging
 
+import pandas as pd
+
 logger = logging.getLogger(__name__)
 
 class Metadata:
-    def __init__(self, cik, ticker, form_type, filed_at, accession_number, document_url):
+    def __init__(self, cik, ticker, form_type, filed_at, accession_number, document_url, size=None):
         self.metadata_file_name = f"{cik}_{accession_number.replace('-', '')}"
         self.cik = cik
         self.ticker = ticker
@@ -12,6 +14,7 @@ class Metadata:
         self.filed_at = filed_at
         self.accession_number = accession_number
         self.sec_index_url = document_url
+        self.size = size  # bytes of the submission, when the source reports it
         self.section_name = None
         self.extraction_method = None
         self.endpoints = [None, None]
@@ -26,4 +29,36 @@ class Metadata:
             json.dump(vars(self), f, indent=2)
 
     def save_to_db(self):
-        logger.info(f"Would save metadata to DB for {self.metadata_file_name}")
\ No newline at end of file
+        logger.info(f"Would save metadata to DB for {self.metadata_file_name}")
+
+
+def iter_metadata(filings_df):
+    """
+    Yield one Metadata per row of the filing metadata frame, reading the
+    columns once instead of materializing a Series per row. Objects are
+    only built as they are consumed.
+    """
+    if "size" in filings_df:
+        sizes = pd.to_numeric(filings_df["size"], errors="coerce").tolist()
+    else:
+        sizes = [None] * len(filings_df)
+
+    columns = zip(
+        filings_df["cik"].tolist(),
+        filings_df["ticker"].tolist(),
+        filings_df["form"].tolist(),
+        filings_df["filingDate"].tolist(),
+        filings_df["accessionNumber"].tolist(),
+        filings_df["filingUrl"].tolist(),
+        sizes,
+    )
+    for cik, ticker, form_type, filed_at, accession_number, document_url, size in columns:
+        yield Metadata(
+            cik=cik,
+            ticker=ticker,
+            form_type=form_type,
+            filed_at=filed_at,
+            accession_number=accession_number,
+            document_url=document_url,
+            size=int(size) if pd.notna(size) else None,
+        )
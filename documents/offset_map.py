@@ -0,0 +1,176 @@
+# documents/offset_map.py
+import logging
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+
+logger = logging.getLogger(__name__)
+
+# First plain ASCII word of a text run, searched for in the markup
+_KEY = re.compile(r"[A-Za-z0-9]{3,32}")
+# How far past the previous anchor a text run is looked for
+_SEARCH_WINDOW = 1 << 20
+
+
+def _last_key(text):
+    last = None
+    for last in _KEY.finditer(text):
+        pass
+    return last
+
+
+def range_covers(source, source_start, source_end, text):
+    """
+    Whether source[source_start:source_end] holds `text`: its first and
+    last plain ASCII words, in that order. Text without one is assumed
+    covered.
+    """
+    first, last = _KEY.search(text), _last_key(text)
+    if first is None:
+        return True
+
+    window = source[source_start:source_end]
+    first, last = first.group(), last.group()
+    if isinstance(window, bytes):
+        first, last = first.encode("ascii"), last.encode("ascii")
+    found = window.find(first)
+    return found >= 0 and window.find(last, found) >= 0
+
+
+class EditLog:
+    """
+    Anchors left by a chain of regex substitutions, so an offset in the
+    rewritten text can be mapped back to the text before the rewrites.
+    """
+
+    def __init__(self):
+        self._steps = []
+
+    def sub(self, pattern, repl, text):
+        out_anchors = array("q")
+        in_anchors = array("q")
+        delta = 0
+
+        def replace(match):
+            nonlocal delta
+            new = repl(match) if callable(repl) else match.expand(repl)
+            delta += len(new) - (match.end() - match.start())
+            # Everything after a match maps back linearly from its end
+            out_anchors.append(match.end() + delta)
+            in_anchors.append(match.end())
+            return new
+
+        result = pattern.sub(replace, text)
+        if out_anchors:
+            self._steps.append((out_anchors, in_anchors))
+        return result
+
+    def to_original(self, pos):
+        for out_anchors, in_anchors in reversed(self._steps):
+            i = bisect_right(out_anchors, pos) - 1
+            if i >= 0:
+                pos = in_anchors[i] + (pos - out_anchors[i])
+        return pos
+
+
+class OffsetMap:
+    """
+    Sorted (plaintext offset, source offset) anchors recorded while a DOM
+    is flattened, one per text run that could be located in the markup.
+
+    Source offsets index the document as handed to HtmlDocument: bytes
+    for raw responses, characters for str. A plaintext span maps to the
+    smallest source range between anchors that covers it, so the slice
+    can be cut from the cached raw bytes without parsing them again.
+    """
+
+    def __init__(self, source=None):
+        self.plain = array("q")
+        self.source = array("q")
+        self._markup = source
+        self._cursor = 0
+
+    # ==========================================================
+    # Recording (during conversion)
+    # ==========================================================
+
+    def add(self, plain_pos, text):
+        """
+        Anchor a text run appended at `plain_pos` to the next place its
+        first word occurs in the markup. Runs without one are skipped.
+        """
+        if text.startswith("[[TABLE:"):
+            # Table placeholders are not in the markup
+            return
+        key = _KEY.search(text)
+        if key is None:
+            return
+
+        needle = key.group()
+        if isinstance(self._markup, bytes):
+            needle = needle.encode("ascii")
+
+        found = self._markup.find(needle, self._cursor, self._cursor + _SEARCH_WINDOW)
+        if found < 0:
+            return
+
+        self.plain.append(plain_pos + key.start())
+        self.source.append(found)
+        # Past the whole run, so the next run's first word is never found
+        # inside this one
+        self._cursor = found + len(needle)
+        last = _last_key(text)
+        if last is not None and last.start() > key.start():
+            needle = last.group()
+            if isinstance(self._markup, bytes):
+                needle = needle.encode("ascii")
+            # Markup of a run is longer than its text only by entities and
+            # collapsed whitespace; look no further than that could reach
+            limit = self._cursor + 8 * (len(text) - key.start()) + 1024
+            end = self._markup.find(needle, self._cursor, limit)
+            if end >= 0:
+                self._cursor = end + len(needle)
+
+    def finish(self, plain_shift, edits=None):
+        """
+        Close the map once the plaintext is final: shift plaintext offsets
+        by what stripping removed and map source offsets back through the
+        preprocessing rewrites.
+        """
+        self._markup = None
+        if plain_shift:
+            self.plain = array("q", (pos - plain_shift for pos in self.plain))
+        if edits is not None:
+            self.source = array("q", (edits.to_original(pos) for pos in self.source))
+
+    # ==========================================================
+    # Lookup
+    # ==========================================================
+
+    def source_range(self, start, end):
+        """
+        (source_start, source_end) covering plaintext[start:end]; the end
+        is None when the span runs past the last anchor.
+        """
+        if not self.plain:
+            return 0, None
+
+        i = bisect_right(self.plain, start) - 1
+        j = bisect_left(self.plain, end)
+        source_start = self.source[i] if i >= 0 else 0
+        source_end = self.source[j] if j < len(self.plain) else None
+        return source_start, source_end
+
+    def to_bytes(self) -> bytes:
+        return array("q", [len(self.plain)]).tobytes() + self.plain.tobytes() + self.source.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        values = array("q")
+        values.frombytes(data)
+        n = values[0]
+
+        offsets = cls()
+        offsets.plain = values[1:n + 1]
+        offsets.source = values[n + 1:]
+        return offsets
@@ -0,0 +1,133 @@
+# documents/sgml.py
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+_HEADER_TAG = re.compile(rb"^<(TYPE|SEQUENCE|FILENAME|DESCRIPTION)>(.*)$")
+
+
+class SgmlDocument:
+    """
+    One <DOCUMENT> part of an EDGAR complete submission file.
+    """
+
+    def __init__(self, doc_type, sequence=None, filename=None, description=None):
+        self.doc_type = doc_type
+        self.sequence = sequence
+        self.filename = filename
+        self.description = description
+        self.text = b""
+
+    def to_sgml(self) -> bytes:
+        header = [b"<DOCUMENT>", b"<TYPE>" + self.doc_type.encode("ascii", "replace")]
+        for tag, value in (
+            (b"SEQUENCE", self.sequence),
+            (b"FILENAME", self.filename),
+            (b"DESCRIPTION", self.description),
+        ):
+            if value:
+                header.append(b"<" + tag + b">" + value.encode("ascii", "replace"))
+        # `text` keeps its final newline, exactly as between <TEXT> and </TEXT>
+        return b"\n".join(header + [b"<TEXT>", b""]) + self.text + b"</TEXT>\n</DOCUMENT>\n"
+
+
+class SgmlSplitter:
+    """
+    Incremental splitter for complete submission (.txt) files.
+
+    Feed it raw byte chunks as they arrive; it scans line by line and only
+    buffers the <TEXT> of parts whose <TYPE> satisfies `wanted`, so
+    graphics, XBRL zips and other unrouted exhibits never accumulate in
+    memory. `feed` and `close` return the SGML of the parts completed so
+    far, ready to be written to a buffer or cache. The parts themselves
+    are dropped once returned, unless `keep_documents` collects them in
+    `documents`.
+    """
+
+    def __init__(self, wanted=None, keep_documents=False):
+        self.wanted = wanted
+        self.keep_documents = keep_documents
+        self.documents = []
+
+        self._pending = b""
+        self._current = None
+        self._keep = False
+        self._in_text = False
+        self._lines = []
+
+    def feed(self, chunk: bytes) -> bytes:
+        data = self._pending + chunk
+        lines = data.split(b"\n")
+        self._pending = lines.pop()
+
+        completed = len(self.documents)
+        for line in lines:
+            self._line(line)
+        return self._emit(completed)
+
+    def close(self) -> bytes:
+        completed = len(self.documents)
+        if self._pending:
+            self._line(self._pending)
+            self._pending = b""
+        if self._current is not None and self._keep:
+            # Truncated submission: keep what arrived
+            self._finish()
+        return self._emit(completed)
+
+    def _emit(self, completed):
+        emitted = b"".join(doc.to_sgml() for doc in self.documents[completed:])
+        if not self.keep_documents:
+            del self.documents[:]
+        return emitted
+
+    def _line(self, line):
+        stripped = line.rstrip(b"\r")
+
+        if self._in_text:
+            if stripped == b"</TEXT>":
+                self._in_text = False
+            elif self._keep:
+                self._lines.append(line)
+            return
+
+        if stripped == b"<DOCUMENT>":
+            self._current = SgmlDocument(doc_type="")
+            self._keep = False
+            self._lines = []
+        elif self._current is None:
+            return
+        elif stripped == b"<TEXT>":
+            self._in_text = True
+            self._keep = bool(self._current.doc_type) and (
+                self.wanted is None or self.wanted(self._current.doc_type)
+            )
+        elif stripped == b"</DOCUMENT>":
+            if self._keep:
+                self._finish()
+            self._current = None
+        else:
+            match = _HEADER_TAG.match(stripped)
+            if match:
+                tag, value = match.group(1), match.group(2).strip().decode("latin-1")
+                attribute = "doc_type" if tag == b"TYPE" else tag.decode().lower()
+                setattr(self._current, attribute, value)
+
+    def _finish(self):
+        self._current.text = b"".join(line + b"\n" for line in self._lines)
+        self.documents.append(self._current)
+        self._current = None
+        self._keep = False
+        self._lines = []
+
+
+def split_sgml(data: bytes, wanted=None) -> list:
+    """
+    Split a whole complete submission (or the filtered SGML kept by
+    SgmlSplitter) into its SgmlDocument parts.
+    """
+    splitter = SgmlSplitter(wanted, keep_documents=True)
+    splitter.feed(data)
+    splitter.close()
+    return splitter.documents
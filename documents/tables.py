@@ -0,0 +1,213 @@
+# documents/tables.py
+"""
+Single-pass table handling shared by the BeautifulSoup and lxml paths.
+
+Each <table> is walked once. The walk collects the stripped strings that
+decide whether it is a data table, plus its rows of non-empty cell texts.
+Data tables leave the text as a `[[TABLE:n]]` placeholder, and their cells
+become a typed, long-format columnar side output keyed by accession,
+section and table ordinal. Large financial statements then no longer
+inflate the plaintext the section regexes scan.
+"""
+import logging
+import re
+from statistics import median
+
+from bs4 import CData, NavigableString, Tag
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER = "[[TABLE:{}]]"
+PLACEHOLDER_RE = re.compile(r"\[\[TABLE:(\d+)\]\]")
+
+TABLE_COLUMNS = (
+    "accession_number",
+    "section",
+    "table_ordinal",
+    "row_index",
+    "column_index",
+    "header",
+    "text",
+    "value",
+)
+
+_CELL_TAGS = frozenset({"td", "th"})
+_ITEM_TEXT = re.compile(r"ITEM\s*\d+[A-Z]?", re.IGNORECASE)
+_NUMBER = re.compile(r"^(\()?\s*[-−]?\s*\$?\s*([\d,]*\.?\d+)\s*%?\s*(\))?$")
+
+
+class TableData:
+    """
+    One table as seen by a single traversal: every stripped string, and
+    its rows as lists of (cell text, is_header) for non-empty cells.
+    """
+
+    def __init__(self):
+        self.strings = []
+        self.rows = []
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Rebuild a table from stored rows (lists of [text, is_header]).
+        """
+        table = cls()
+        table.rows = [[(text, bool(is_header)) for text, is_header in row] for row in rows]
+        return table
+
+    def is_data_table(self) -> bool:
+        if not self.strings:
+            return False
+        if any(_ITEM_TEXT.search(s) for s in self.strings):
+            return False
+        return len(self.strings) > 5 and median(len(s) for s in self.strings) < 30
+
+    def headers(self):
+        if not self.rows:
+            return []
+        return [text for text, is_header in self.rows[0] if is_header]
+
+
+def scan_soup_table(table) -> TableData:
+    data = TableData()
+    # Innermost enclosing row / cell of every tag seen so far
+    row_of = {id(table): None}
+    cell_of = {id(table): None}
+
+    for node in table.descendants:
+        parent = id(node.parent)
+
+        if isinstance(node, Tag):
+            row, cell = row_of[parent], cell_of[parent]
+            if node.name == "tr":
+                row = []
+                data.rows.append(row)
+            elif node.name in _CELL_TAGS:
+                cell = [node.name == "th", []]
+                if row is not None:
+                    row.append(cell)
+            row_of[id(node)], cell_of[id(node)] = row, cell
+        elif type(node) in (NavigableString, CData):
+            # Same strings as `stripped_strings`: no comments or scripts
+            text = node.strip()
+            if text:
+                data.strings.append(text)
+                cell = cell_of[parent]
+                if cell is not None:
+                    cell[1].append(text)
+
+    _finish_rows(data)
+    return data
+
+
+def scan_lxml_table(table) -> TableData:
+    data = TableData()
+    row_of = {table: None}
+    cell_of = {table: None}
+
+    for element in table.iter():
+        if element is table:
+            row, cell = None, None
+        else:
+            parent = element.getparent()
+            row, cell = row_of[parent], cell_of[parent]
+
+            # The tail follows the element, inside its parent's cell
+            if element.tail:
+                _add_text(data, cell, element.tail)
+
+        if not isinstance(element.tag, str):
+            continue
+
+        if element.tag == "tr":
+            row = []
+            data.rows.append(row)
+        elif element.tag in _CELL_TAGS:
+            cell = [element.tag == "th", []]
+            if row is not None:
+                row.append(cell)
+        row_of[element], cell_of[element] = row, cell
+
+        if element.text:
+            _add_text(data, cell, element.text)
+
+    _finish_rows(data)
+    return data
+
+
+def _add_text(data, cell, text):
+    text = text.strip()
+    if text:
+        data.strings.append(text)
+        if cell is not None:
+            cell[1].append(text)
+
+
+def _finish_rows(data):
+    rows = []
+    for row in data.rows:
+        cells = [("".join(parts), is_header) for is_header, parts in row if parts]
+        if cells:
+            rows.append(cells)
+    data.rows = rows
+
+
+# ==========================================================
+# Columnar side output
+# ==========================================================
+
+def parse_number(text):
+    """
+    Numeric value of a financial-table cell ("$1,234", "(56.7)", "12%"),
+    or None. Parentheses mean a negative amount.
+    """
+    match = _NUMBER.match(text)
+    if not match or bool(match.group(1)) != bool(match.group(3)):
+        return None
+    try:
+        value = float(match.group(2).replace(",", ""))
+    except ValueError:
+        return None
+    if match.group(1) or "-" in text or "−" in text:
+        value = -value
+    return value
+
+
+def empty_columns():
+    return {column: [] for column in TABLE_COLUMNS}
+
+
+def add_table_columns(columns, accession_number, section, ordinal, table):
+    headers = table.headers()
+
+    for row_index, cells in enumerate(table.rows):
+        use_headers = bool(headers) and len(headers) == len(cells)
+        for column_index, (text, _) in enumerate(cells):
+            columns["accession_number"].append(accession_number)
+            columns["section"].append(section)
+            columns["table_ordinal"].append(ordinal)
+            columns["row_index"].append(row_index)
+            columns["column_index"].append(column_index)
+            columns["header"].append(headers[column_index] if use_headers else None)
+            columns["text"].append(text)
+            columns["value"].append(parse_number(text))
+
+
+def section_table_columns(accession_number, sections, tables):
+    """
+    Columns for every table whose placeholder appears in `sections`
+    (section name -> text); `tables` is indexed by ordinal.
+    """
+    columns = empty_columns()
+    for section, text in sections.items():
+        for match in PLACEHOLDER_RE.finditer(text):
+            ordinal = int(match.group(1))
+            if ordinal < len(tables):
+                add_table_columns(columns, accession_number, section, ordinal, tables[ordinal])
+    return columns
+
+
+def extend_columns(columns, more):
+    for column in TABLE_COLUMNS:
+        columns[column].extend(more[column])
+    return columns
@@ -1,37 +1,67 @@
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict
 
 import pandas as pd
 
-from documents.metadata import Metadata
-from extraction.section_extractor import process_filing
-from config.settings import OUTPUT_DIR
+from documents.metadata import iter_metadata
+from extraction.scheduler import FilingScheduler
+from data_access.raw_cache import get_raw_cache
+from config.search_patterns import PatternRegistry
+from config.settings import (
+    OUTPUT_DIR,
+    FETCH_WORKERS,
+    PARSE_WORKERS,
+    LARGEST_FIRST,
+    RAW_CACHE_ENABLED,
+)
 
 logger = logging.getLogger(__name__)
 
 
 def fetch_content_batch(
     filings_df: pd.DataFrame,
-    search_patterns_path: dict,
-    max_workers: int = 8,
+    search_patterns_path: PatternRegistry,
+    fetch_workers: int = FETCH_WORKERS,
+    parse_workers: int = PARSE_WORKERS,
+    sink=None,
+    manifest=None,
 ) -> List[Dict]:
     """
     Parallel extraction of SEC filings content.
 
+    Runs a FilingScheduler: a thread pool fetches raw documents (network
+    or raw cache) and hands each one to a process pool that parses and
+    runs the section regexes, so CPU work is not serialized by the GIL.
+    Stages are bounded and fetching pauses while the documents waiting
+    for a parser exceed the in-flight memory budget.
+
+    With LARGEST_FIRST, filings are dispatched in decreasing size order
+    (longest processing time first), so the few giant 10-Ks start early
+    instead of trailing at the end of the batch.
+
     Parameters
     ----------
     filings_df : pd.DataFrame
         Output of fetch_filing_metadata()
-    search_patterns_path : str
-        Path to document_group_section_search.json
-    max_workers : int
-        Thread pool size
+    search_patterns_path : PatternRegistry
+        Compiled search patterns (load_search_patterns); pickled to each
+        parse worker once, at start-up
+    fetch_workers : int
+        I/O thread pool size
+    parse_workers : int
+        Parse/extract process pool size
+    sink : FilingSink, optional
+        Receives each filing's result as soon as it is extracted, so
+        nothing accumulates in memory; without one, rows are collected
+    manifest : ExtractionManifest, optional
+        Filings it records as complete are skipped; fetch and extraction
+        failures, and filings without sections, are recorded in it. The
+        sink reports completed filings to it on commit
 
     Returns
     -------
     List[Dict]
-        Extracted sections ready for Parquet
+        One row per extracted section; empty when a sink was given
     """
 
     if filings_df.empty:
@@ -41,38 +71,47 @@ def fetch_content_batch(
     # 1️⃣ Load search patterns ONCE
     search_patterns = search_patterns_path
 
-    tasks = []
-    results = []
-
-    logger.info(f"Starting parallel extraction with {max_workers} workers")
-
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        for _, row in filings_df.iterrows():
-
-            metadata = Metadata(
-                cik=row["cik"],
-                ticker=row["ticker"],
-                form_type=row["form"],
-                filed_at=row["filingDate"],
-                accession_number=row["accessionNumber"],
-                document_url=row["filingUrl"],
-            )
-
-            tasks.append(
-                executor.submit(
-                    process_filing,
-                    metadata,
-                    search_patterns,
-                )
-            )
-
-        for future in as_completed(tasks):
-            try:
-                result = future.result()
-                if result is not None:
-                    results.append(result)
-            except Exception as e:
-                logger.exception("Extraction failed", exc_info=e)
-
-    logger.info(f"Extracted {len(results)} sections successfully")
+    if LARGEST_FIRST:
+        filings_df = _largest_first(filings_df)
+
+    metadata_stream = iter_metadata(filings_df)
+    n_filings = len(filings_df)
+    if manifest is not None:
+        completed = manifest.completed()
+        n_done = int(filings_df["accessionNumber"].isin(completed).sum())
+        metadata_stream = (m for m in metadata_stream if m.accession_number not in completed)
+        n_filings -= n_done
+        logger.info(f"Resuming: {n_done} filings already extracted, {n_filings} to go")
+
+    scheduler = FilingScheduler(
+        search_patterns,
+        fetch_workers=fetch_workers,
+        parse_workers=parse_workers,
+        sink=sink,
+        manifest=manifest,
+    )
+    results = scheduler.run(metadata_stream, n_filings)
+
+    logger.info(f"Extracted {scheduler.n_sections} sections successfully")
     return results
+
+
+def _largest_first(filings_df):
+    """
+    Sort filings by estimated size, largest first. The estimate is the
+    raw cache's record of the document when there is one, else the
+    submissions `size`, else the median known size of the form type.
+    """
+    filings_df = filings_df.reset_index(drop=True)
+    size = pd.Series(float("nan"), index=filings_df.index)
+    if "size" in filings_df:
+        size = pd.to_numeric(filings_df["size"], errors="coerce")
+
+    if RAW_CACHE_ENABLED:
+        cached = get_raw_cache().raw_sizes(filings_df["accessionNumber"])
+        if cached:
+            size = filings_df["accessionNumber"].map(cached).fillna(size)
+
+    size = size.fillna(size.groupby(filings_df["form"]).transform("median")).fillna(0)
+    order = size.sort_values(ascending=False, kind="stable").index
+    return filings_df.loc[order]
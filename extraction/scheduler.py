@@ -0,0 +1,322 @@
+# extraction/scheduler.py
+import logging
+import multiprocessing
+import time
+from concurrent.futures import (
+    ThreadPoolExecutor,
+    ProcessPoolExecutor,
+    wait,
+    FIRST_COMPLETED,
+)
+from concurrent.futures.process import BrokenProcessPool
+
+from config.logging_config import setup_worker_logger
+from data_access.plaintext_store import reset_plaintext_store
+from extraction.section_extractor import (
+    NothingToExtract,
+    PendingFetch,
+    plan_fetch,
+    finish_fetch,
+    extract_filing,
+)
+from data_access.sec_client import submit_stream_get
+from config.settings import (
+    FETCH_WORKERS,
+    PARSE_WORKERS,
+    INFLIGHT_BYTES_BUDGET,
+    QUEUE_REPORT_INTERVAL,
+)
+
+logger = logging.getLogger(__name__)
+
+# Parse workers are spawned, not forked: a fork would copy locks held by
+# fetch threads (stores, logging) and the parent's SQLite connections
+_PARSE_CONTEXT = multiprocessing.get_context("spawn")
+
+# Patterns of a parse worker process, set once by _init_parse_worker
+_worker_patterns = None
+
+
+def _init_parse_worker(search_patterns, log_level):
+    global _worker_patterns
+    setup_worker_logger(log_level)
+    # Writes go through a connection of this process, never the parent's
+    reset_plaintext_store()
+    _worker_patterns = search_patterns
+
+
+def _extract_in_worker(metadata, fetched):
+    return extract_filing(metadata, fetched, _worker_patterns)
+
+
+class FilingScheduler:
+    """
+    Bounded metadata -> fetch -> parse -> write pipeline.
+
+    Metadata is pulled from a lazy stream only when the fetch stage has a
+    free slot, so nothing is built for filings that have not started.
+    The fetch stage (threads) admits a filing only while the parse queue
+    has room and the bytes in flight stay under `inflight_bytes`: those
+    waiting for or inside a parser, plus the estimated size of every
+    filing still being fetched (its submissions `size`, else the mean of
+    the documents fetched so far). A slow parse stage therefore pauses
+    fetching instead of piling documents up in memory. The parse stage (processes)
+    never holds more than `max_parse_queue` documents, counting those
+    still being fetched. Results are written to the sink as they
+    complete.
+
+    Fetch threads only do local work (stores, cache). Downloads run on the
+    SEC client's event loop and are waited on here with everything else,
+    so a throttled host's retry sleeps hold no fetch thread.
+
+    Stage depths are logged every `report_interval` seconds and their
+    peaks once the run ends.
+    """
+
+    def __init__(
+        self,
+        search_patterns,
+        fetch_workers=FETCH_WORKERS,
+        parse_workers=PARSE_WORKERS,
+        sink=None,
+        manifest=None,
+        inflight_bytes=INFLIGHT_BYTES_BUDGET,
+        report_interval=QUEUE_REPORT_INTERVAL,
+    ):
+        self.search_patterns = search_patterns
+        self.fetch_workers = fetch_workers
+        self.parse_workers = parse_workers
+        # Documents in the parse stage, counting the fetches that will land
+        # there; at least fetch_workers so an idle parse stage never
+        # throttles fetching
+        self.max_parse_queue = max(parse_workers * 2, fetch_workers)
+        self.sink = sink
+        self.manifest = manifest
+        self.inflight_bytes = inflight_bytes
+        self.report_interval = report_interval
+
+        self.n_sections = 0
+        self.peaks = {"fetching": 0, "parsing": 0, "parse_bytes": 0}
+
+        self._fetching = {}
+        self._downloading = {}
+        self._parsing = {}
+        self._parse_bytes = 0
+        # Estimated bytes of the filings in the fetch stage, by metadata id
+        self._reserved = {}
+        self._fetch_bytes = 0
+        self._fetched_bytes = 0
+        self._n_fetched = 0
+        self._remaining = 0
+
+    def run(self, metadata_stream, n_filings):
+        """
+        Extract every filing of `metadata_stream` (`n_filings` long).
+        Returns the section rows when there is no sink, else [].
+        """
+        results = []
+        self._remaining = n_filings
+        next_report = time.monotonic() + self.report_interval
+
+        logger.info(
+            f"Starting extraction with {self.fetch_workers} fetch threads "
+            f"and {self.parse_workers} parse processes"
+        )
+
+        with ThreadPoolExecutor(max_workers=self.fetch_workers) as fetchers, \
+                ProcessPoolExecutor(
+                    max_workers=self.parse_workers,
+                    mp_context=_PARSE_CONTEXT,
+                    initializer=_init_parse_worker,
+                    initargs=(self.search_patterns, logging.getLogger().level),
+                ) as parsers:
+
+            try:
+                self._admit(metadata_stream, fetchers)
+                while self._fetching or self._downloading or self._parsing:
+                    done, _ = wait(
+                        [*self._fetching, *self._downloading, *self._parsing],
+                        timeout=self.report_interval,
+                        return_when=FIRST_COMPLETED,
+                    )
+
+                    for future in done:
+                        if future in self._fetching:
+                            self._fetched(future, parsers)
+                        elif future in self._downloading:
+                            self._downloaded(future, fetchers)
+                        else:
+                            self._parsed(future, results)
+
+                    self._admit(metadata_stream, fetchers)
+
+                    if time.monotonic() >= next_report:
+                        self._report()
+                        next_report = time.monotonic() + self.report_interval
+            except BrokenProcessPool as e:
+                # A parse worker died (killed, out of memory): no filing can
+                # be parsed any more, so record everything in flight and stop
+                logger.error(f"Parse pool broken, aborting the run: {e}")
+                self._fail_in_flight(e)
+                raise
+
+        logger.info(
+            f"Peak queues | fetching {self.peaks['fetching']} | "
+            f"parsing {self.peaks['parsing']} "
+            f"({self.peaks['parse_bytes'] / 1024 ** 2:.0f} MB)"
+        )
+        return results
+
+    # ==========================================================
+    # Stages
+    # ==========================================================
+
+    def _admit(self, metadata_stream, fetchers):
+        while (
+            len(self._fetching) < self.fetch_workers
+            and self._in_flight() < self.max_parse_queue
+            # One document always gets through, however large
+            and (
+                self._parse_bytes + self._fetch_bytes < self.inflight_bytes
+                or not self._in_flight()
+            )
+        ):
+            metadata = next(metadata_stream, None)
+            if metadata is None:
+                return
+            self._remaining -= 1
+            self._reserve(metadata)
+            future = fetchers.submit(plan_fetch, metadata, self.search_patterns)
+            self._fetching[future] = metadata
+            self._peak("fetching", len(self._fetching))
+
+    def _fetched(self, future, parsers):
+        metadata = self._fetching.pop(future)
+        try:
+            fetched = future.result()
+        except Exception as e:
+            logger.exception("Fetch failed", exc_info=e)
+            self._release(metadata)
+            self._mark_failed(metadata, e)
+            return
+        if isinstance(fetched, NothingToExtract):
+            self._release(metadata)
+            self._mark_empty(metadata, fetched.reason)
+            return
+        if fetched is None:
+            self._release(metadata)
+            self._mark_failed(metadata, "Download failed")
+            return
+        if isinstance(fetched, PendingFetch):
+            download = submit_stream_get(fetched.url, make_filter=fetched.make_filter)
+            self._downloading[download] = (metadata, fetched)
+            return
+
+        size = fetched.size
+        self._release(metadata)
+        self._fetched_bytes += size
+        self._n_fetched += 1
+        try:
+            future = parsers.submit(_extract_in_worker, metadata, fetched)
+        except BrokenProcessPool as e:
+            self._mark_failed(metadata, e)
+            raise
+        self._parse_bytes += size
+        self._parsing[future] = (metadata, size)
+        self._peak("parsing", len(self._parsing))
+        self._peak("parse_bytes", self._parse_bytes)
+
+    def _downloaded(self, future, fetchers):
+        metadata, pending = self._downloading.pop(future)
+        try:
+            response = future.result()
+        except Exception as e:
+            logger.exception("Download failed", exc_info=e)
+            self._release(metadata)
+            self._mark_failed(metadata, e)
+            return
+        # Caching compresses the document; keep it off the loop thread
+        future = fetchers.submit(finish_fetch, metadata, pending, response)
+        self._fetching[future] = metadata
+
+    def _parsed(self, future, results):
+        metadata, size = self._parsing.pop(future)
+        self._parse_bytes -= size
+        try:
+            result = future.result()
+        except BrokenProcessPool as e:
+            self._mark_failed(metadata, e)
+            raise
+        except Exception as e:
+            logger.exception("Extraction failed", exc_info=e)
+            self._mark_failed(metadata, e)
+            return
+        if self.manifest is not None:
+            # Kept apart from the filing's status, which the sink sets on commit
+            self.manifest.mark_section_errors(metadata.accession_number, result.errors)
+        if not result.rows:
+            self._mark_empty(metadata)
+            return
+
+        self.n_sections += len(result.rows)
+        if self.sink is not None:
+            self.sink.write(result)
+        else:
+            results.extend(result.rows)
+
+    # ==========================================================
+    # Helpers
+    # ==========================================================
+
+    def _reserve(self, metadata):
+        size = metadata.size
+        if not size and self._n_fetched:
+            size = self._fetched_bytes / self._n_fetched
+        self._reserved[id(metadata)] = size or 0
+        self._fetch_bytes += size or 0
+
+    def _release(self, metadata):
+        self._fetch_bytes -= self._reserved.pop(id(metadata), 0)
+
+    def _mark_empty(self, metadata, reason=None):
+        if self.manifest is not None:
+            self.manifest.mark_empty(metadata.accession_number, reason)
+
+    def _mark_failed(self, metadata, error):
+        if self.manifest is not None:
+            self.manifest.mark_failed(metadata.accession_number, error)
+
+    def _fail_in_flight(self, error):
+        """
+        Record every filing still in a stage as failed, and drop them.
+        """
+        for future, metadata in self._fetching.items():
+            future.cancel()
+            self._mark_failed(metadata, error)
+        for future, (metadata, pending) in self._downloading.items():
+            future.cancel()
+            self._mark_failed(metadata, error)
+        for metadata, size in self._parsing.values():
+            self._mark_failed(metadata, error)
+        self._fetching.clear()
+        self._downloading.clear()
+        self._parsing.clear()
+
+    def _in_flight(self):
+        return len(self._fetching) + len(self._downloading) + len(self._parsing)
+
+    def _peak(self, stage, depth):
+        if depth > self.peaks[stage]:
+            self.peaks[stage] = depth
+
+    def _report(self):
+        writing = self.sink.pending_rows if self.sink is not None else 0
+        logger.info(
+            f"Queues | metadata {self._remaining} | "
+            f"fetching {len(self._fetching)}/{self.fetch_workers} | "
+            f"downloading {len(self._downloading)} "
+            f"(~{self._fetch_bytes / 1024 ** 2:.0f} MB) | "
+            f"parsing {len(self._parsing)}/{self.max_parse_queue} "
+            f"({self._parse_bytes / 1024 ** 2:.0f} MB) | "
+            f"writing {writing} rows | sections {self.n_sections}"
+        )
@@ -1,14 +1,169 @@
 # extraction/section_extractor.py
 import logging
-from documents.html_document import HtmlDocument
-from data_access.sec_client import safe_get
+from documents.html_document import HtmlDocument, PARSER_VERSION
+from documents.offset_map import OffsetMap
+from documents.sgml import SgmlSplitter, split_sgml
+from documents.tables import TableData, empty_columns, extend_columns
+from data_access.sec_client import stream_get
+from data_access.raw_cache import get_raw_cache
+from data_access.plaintext_store import PreparedDocument, get_plaintext_store
+from config.settings import (
+    RAW_CACHE_ENABLED,
+    FETCH_COMPLETE_SUBMISSION,
+    EXTRACTION_METHOD,
+    PLAINTEXT_STORE_ENABLED,
+)
+import hashlib
 import json
+from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 
-def process_filing(metadata, search_patterns):
+def cached_document(accession_number, document):
     """
-    Process a single SEC filing using provided Metadata object.
+    (content bytes, encoding) of a document in the raw cache, or None.
+    """
+    if not RAW_CACHE_ENABLED:
+        return None
+
+    cached = get_raw_cache().get(accession_number, document)
+    if cached is not None:
+        logger.debug(f"Raw cache hit: {accession_number}/{document}")
+    return cached
+
+
+def cache_document(accession_number, document, response):
+    """
+    Store a downloaded SecResponse in the raw cache and return its
+    (content bytes, encoding); (None, None) when the download failed.
+    """
+    if response is None:
+        return None, None
+
+    if RAW_CACHE_ENABLED:
+        get_raw_cache().put(accession_number, document, response.content, response.encoding)
+
+    return response.content, response.encoding
+
+
+def submission_url(metadata):
+    """
+    URL of the accession's complete submission file, next to its documents.
+    """
+    folder = metadata.sec_index_url.rsplit("/", 1)[0]
+    return f"{folder}/{metadata.accession_number}.txt"
+
+
+def routing_key(search_patterns):
+    """
+    Short digest of the pattern groups submission parts are routed to.
+    Filtered submissions are cached under it, so adding or removing a
+    group never serves parts kept (or dropped) for another set.
+    """
+    groups = "\0".join(sorted(search_patterns))
+    return hashlib.sha1(groups.encode("utf-8")).hexdigest()[:8]
+
+
+def pattern_group(doc_type, search_patterns):
+    """
+    Route a <TYPE> value to its pattern group: exact form match first,
+    then the exhibit family (EX-99.1 -> EX-99). None when unrouted.
+    """
+    if doc_type in search_patterns:
+        return doc_type
+    family = doc_type.split(".", 1)[0]
+    if family in search_patterns:
+        return family
+    return None
+
+
+class FetchedFiling:
+    """
+    Raw bytes of one filing as handed from the fetch stage to the
+    extraction stage. `is_submission` marks filtered complete-submission
+    SGML that still has to be split into its parts. `source` names the
+    fetched file in the raw cache and plaintext store.
+    """
+
+    def __init__(
+        self, url, content, encoding=None, is_submission=False, prepared=None, source=None
+    ):
+        self.url = url
+        self.content = content
+        self.encoding = encoding
+        self.is_submission = is_submission
+        # PreparedDocuments from the plaintext store; `content` is then None
+        self.prepared = prepared
+        self.source = source or _file_name(url)
+
+    @property
+    def size(self):
+        """
+        Bytes (or stored plaintext characters) handed to the parse stage.
+        """
+        if self.prepared is not None:
+            return sum(len(doc.plaintext) for doc in self.prepared)
+        return len(self.content)
+
+
+class FilingResult:
+    """
+    What the extraction stage returns for one filing: one row per
+    extracted section, the columnar cells of its data tables, and the
+    (section, document, error) of each pattern that timed out. `rows` is
+    empty when no section was extracted.
+    """
+
+    def __init__(self, rows, tables, errors=()):
+        self.rows = rows
+        self.tables = tables
+        self.errors = list(errors)
+
+
+class NothingToExtract:
+    """
+    A filing the fetch stage found nothing to extract from: no patterns
+    for its form, or an empty document. A permanent outcome, recorded as
+    empty with `reason`, unlike a failed download.
+    """
+
+    def __init__(self, reason):
+        self.reason = reason
+
+
+class PendingFetch:
+    """
+    A filing document that no local store holds, so the fetch stage still
+    has to download it. `make_filter` builds the chunk filter to stream it
+    through, if any; `document` names it in the raw cache.
+    """
+
+    def __init__(self, url, document, is_submission=False, make_filter=None):
+        self.url = url
+        self.document = document
+        self.is_submission = is_submission
+        self.make_filter = make_filter
+
+
+def fetch_filing(metadata, search_patterns):
+    """
+    I/O stage: fetch (or read from cache) the bytes a filing needs.
+    Returns a FetchedFiling, a NothingToExtract, or None when the
+    download failed.
+    """
+    planned = plan_fetch(metadata, search_patterns)
+    if not isinstance(planned, PendingFetch):
+        return planned
+
+    response = stream_get(planned.url, make_filter=planned.make_filter)
+    return finish_fetch(metadata, planned, response)
+
+
+def plan_fetch(metadata, search_patterns):
+    """
+    First half of fetch_filing, without the network: a FetchedFiling when
+    the plaintext store or raw cache already holds the filing, a
+    PendingFetch when it must be downloaded, or a NothingToExtract.
     """
 
     logger.info(
@@ -18,44 +173,255 @@ def process_filing(metadata, search_patterns):
 
     url = metadata.sec_index_url  # ✅ FIX 1: lấy URL từ metadata
 
-    response = safe_get(url)
-    if response is None:
-        logger.error(f"Failed to fetch filing: {url}")
-        return False
-
-    html_text = response.text
-    if not html_text:
-        logger.error(f"No HTML content for filing: {url}")
-        return False
-
-    patterns = search_patterns.get(metadata.form_type, [])
-    if not patterns:
-        logger.warning(f"No search patterns for form type: {metadata.form_type}")
-        return False
-
-    doc = HtmlDocument(
-        file_path=url,
-        doc_text=html_text,
-        extraction_method="regex",
-        metadata=metadata,
-        search_patterns=patterns  # ✅ BẮT BUỘC
+    if FETCH_COMPLETE_SUBMISSION or url.endswith(f"/{metadata.accession_number}.txt"):
+        url = submission_url(metadata)
+        # Which parts are kept depends on the pattern groups
+        source = f"{_file_name(url)}#{routing_key(search_patterns)}"
+
+        prepared = _stored_plaintext(metadata, source)
+        if prepared is not None:
+            return FetchedFiling(
+                url, None, is_submission=True, prepared=prepared, source=source
+            )
+
+        def wanted(doc_type):
+            return pattern_group(doc_type, search_patterns) is not None
+
+        pending = PendingFetch(
+            url, source, is_submission=True, make_filter=lambda: SgmlSplitter(wanted)
+        )
+    else:
+        if not search_patterns.get(metadata.form_type):
+            reason = f"No search patterns for form type: {metadata.form_type}"
+            logger.warning(reason)
+            return NothingToExtract(reason)
+
+        prepared = _stored_plaintext(metadata, _file_name(url))
+        if prepared is not None:
+            return FetchedFiling(url, None, prepared=prepared)
+
+        pending = PendingFetch(url, _file_name(url))
+
+    cached = cached_document(metadata.accession_number, pending.document)
+    if cached is not None:
+        return _fetched(pending, *cached)
+    return pending
+
+
+def finish_fetch(metadata, pending, response):
+    """
+    Second half of fetch_filing: cache a download (the SecResponse, or None
+    when it failed) and wrap it for the extraction stage. Returns None only
+    when the download failed.
+    """
+    content, encoding = cache_document(metadata.accession_number, pending.document, response)
+    if content is None:
+        kind = "submission" if pending.is_submission else "filing"
+        logger.error(f"Failed to fetch {kind}: {pending.url}")
+        return None
+    return _fetched(pending, content, encoding)
+
+
+def _fetched(pending, content, encoding):
+    if not content and not pending.is_submission:
+        logger.warning(f"No HTML content for filing: {pending.url}")
+        return NothingToExtract("Empty document")
+    return FetchedFiling(
+        pending.url,
+        content,
+        encoding,
+        is_submission=pending.is_submission,
+        source=pending.document,
     )
 
-    extracted_text = doc.get_excerpt(search_patterns=patterns)
-    
-    if not extracted_text:
+
+def extract_filing(metadata, fetched, search_patterns):
+    """
+    CPU stage: parse the fetched bytes and extract every section.
+    Pure function of its inputs, so it can run in a worker process.
+    Filings served from the plaintext store skip parsing altogether.
+    Returns a FilingResult, without rows when nothing was extracted.
+    """
+    if fetched.prepared is not None:
+        documents = [
+            (prepared.doc_type, _from_prepared(metadata, fetched, prepared, search_patterns))
+            for prepared in fetched.prepared
+            # Stored parts whose pattern group has since been removed
+            if not fetched.is_submission or pattern_group(prepared.doc_type, search_patterns)
+        ]
+    else:
+        documents = _prepare(metadata, fetched, search_patterns)
+
+    sections = []
+    names = set()
+    errors = []
+    table_columns = empty_columns()
+    for doc_type, doc in documents:
+        doc.get_excerpt(search_patterns=doc.search_patterns)
+        ranges = doc.source_ranges()
+        errors.extend(
+            (section_name, _file_name(doc.file_path), error)
+            for section_name, error in doc.pattern_timeouts
+        )
+
+        part_sections = {}
+        for section_name, text in doc.extracted_content.items():
+            # Several exhibits may share a group (EX-99.1, EX-99.2)
+            key = section_name
+            if key in names:
+                key = f"{section_name}:{doc_type}"
+            names.add(key)
+            part_sections[key] = text
+            sections.append(
+                (
+                    key,
+                    _file_name(doc.file_path),
+                    text,
+                    ranges.get(section_name),
+                    doc.section_warnings.get(section_name, []),
+                )
+            )
+
+        extend_columns(
+            table_columns, doc.section_tables(metadata.accession_number, part_sections)
+        )
+
+    if not sections:
         logger.warning(f"No section extracted for {metadata.metadata_file_name}")
+
+    extracted_at = datetime.now(timezone.utc)
+    table_columns["extracted_at"] = [extracted_at] * len(table_columns["accession_number"])
+    return FilingResult(
+        [_section_row(metadata, extracted_at, *section) for section in sections],
+        table_columns,
+        errors,
+    )
+
+
+def process_filing(metadata, search_patterns):
+    """
+    Process a single SEC filing using provided Metadata object.
+    """
+    fetched = fetch_filing(metadata, search_patterns)
+    if not isinstance(fetched, FetchedFiling):
+        return None
+
+    return extract_filing(metadata, fetched, search_patterns)
+
+
+def _prepare(metadata, fetched, search_patterns):
+    """
+    Parse the fetched bytes into (doc_type, HtmlDocument) pairs with their
+    plaintext ready, and persist that plaintext for later pattern runs.
+    A complete submission yields every part whose <TYPE> has a pattern
+    group: the main form plus routed exhibits (EX-13, EX-99, ...).
+    """
+    if fetched.is_submission:
+        def wanted(doc_type):
+            return pattern_group(doc_type, search_patterns) is not None
+
+        parts = [
+            (part.filename or part.sequence, part.doc_type, part.text)
+            for part in split_sgml(fetched.content, wanted)
+        ]
+    else:
+        parts = [(_file_name(fetched.url), metadata.form_type, fetched.content)]
+
+    documents = []
+    prepared = []
+    for document, doc_type, content in parts:
+        doc = _document(
+            metadata,
+            f"{fetched.url}#{document}" if fetched.is_submission else fetched.url,
+            content,
+            fetched.encoding,
+            _patterns_for(doc_type, fetched, search_patterns),
+        )
+        doc.prepare_text()
+        documents.append((doc_type, doc))
+        prepared.append(
+            PreparedDocument(
+                document,
+                doc_type,
+                doc.plaintext,
+                [t.rows for t in doc.tables],
+                doc.offset_map.to_bytes() if doc.offset_map is not None else None,
+            )
+        )
+
+    if PLAINTEXT_STORE_ENABLED and prepared:
+        get_plaintext_store().put_filing(
+            metadata.accession_number, fetched.source, prepared, PARSER_VERSION
+        )
+
+    return documents
+
+
+def _from_prepared(metadata, fetched, prepared, search_patterns):
+    doc = _document(
+        metadata,
+        f"{fetched.url}#{prepared.document}" if fetched.is_submission else fetched.url,
+        None,
+        None,
+        _patterns_for(prepared.doc_type, fetched, search_patterns),
+    )
+    doc.load_prepared(
+        prepared.plaintext,
+        [TableData.from_rows(rows) for rows in prepared.tables],
+        OffsetMap.from_bytes(prepared.offsets) if prepared.offsets is not None else None,
+    )
+    return doc
+
+
+def _patterns_for(doc_type, fetched, search_patterns):
+    if fetched.is_submission:
+        return search_patterns.get(pattern_group(doc_type, search_patterns), [])
+    return search_patterns.get(doc_type, [])
+
+
+def _stored_plaintext(metadata, source):
+    if not PLAINTEXT_STORE_ENABLED:
         return None
 
+    prepared = get_plaintext_store().get_filing(
+        metadata.accession_number, source, PARSER_VERSION
+    )
+    if prepared is not None:
+        logger.debug(f"Plaintext store hit: {metadata.accession_number}")
+    return prepared
+
+
+def _file_name(url):
+    return url.rsplit("/", 1)[-1]
+
+
+def _document(metadata, file_path, content, encoding, patterns):
+    return HtmlDocument(
+        file_path=file_path,
+        doc_text=content,
+        encoding=encoding,
+        extraction_method=EXTRACTION_METHOD,
+        metadata=metadata,
+        search_patterns=patterns  # ✅ BẮT BUỘC
+    )
+
+
+def _section_row(metadata, extracted_at, section, document, text, source_range, warnings):
+    source_start, source_end = source_range or (None, None)
     return {
         "cik": metadata.cik,
         "ticker": metadata.ticker,
         "form_type": metadata.form_type,
         "filed_at": metadata.filed_at,
         "accession_number": metadata.accession_number,
-        "section": metadata.section_name,
-        "content": extracted_text,
+        "section": section,
+        "document": document,
+        "content": text,
+        "n_characters": len(text),
+        "content_hash": hashlib.sha1(text.encode("utf-8")).hexdigest(),
         "extraction_method": metadata.extraction_method,
-        "warnings": json.dumps(metadata.warnings),
+        "warnings": json.dumps(warnings),
+        "source_start": source_start,
+        "source_end": source_end,
+        "extracted_at": extracted_at,
     }
-
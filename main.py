@@ -1,45 +1,83 @@
 # main.py
-import os
 from config.logging_config import setup_logger
-from config.settings import load_ciks
+from config.settings import (
+    load_ciks,
+    METADATA_DELTA_MODE,
+    BULK_SUBMISSIONS_ZIP,
+    BULK_FORM_INDEX_FILES,
+    MANIFEST_ENABLED,
+)
 from config.search_patterns import load_search_patterns
 from data_access.filing_metadata import fetch_filing_metadata
+from data_access.bulk_ingest import ingest_submissions_zip, ingest_form_index
 from extraction.batch_processor import fetch_content_batch
-import polars as pl
+from data_access.sec_client import get_client
+from data_access.watermarks import WatermarkStore
+from data_access.parquet_sink import FilingSink
+from data_access.manifest import ExtractionManifest
+from documents.html_document import PARSER_VERSION
+
 
 def main():
     logger = setup_logger()
 
-    # 1️⃣ Load CIK universe
-    ciks_df = load_ciks()
+    try:
+        # 1️⃣ Load CIK universe
+        ciks_df = load_ciks()
 
-    # 2️⃣ Fetch filing metadata
-    filings_df = fetch_filing_metadata(ciks_df)
+        # 2️⃣ Fetch filing metadata (bulk files if provided, else the API;
+        #    only new filings in delta mode)
+        watermarks = None
+        if BULK_SUBMISSIONS_ZIP:
+            filings_df = ingest_submissions_zip(BULK_SUBMISSIONS_ZIP, ciks_df)
+        elif BULK_FORM_INDEX_FILES:
+            filings_df = ingest_form_index(BULK_FORM_INDEX_FILES, ciks_df)
+        else:
+            watermarks = WatermarkStore() if METADATA_DELTA_MODE else None
+            filings_df = fetch_filing_metadata(ciks_df, watermarks=watermarks)
 
-    if filings_df.empty:
-        print("No filings found. Exiting.")
-        return
+        if filings_df.empty:
+            print("No filings found. Exiting.")
+            if watermarks is not None:
+                watermarks.commit()
+            return
 
-    search_patterns = load_search_patterns(
-        "SEC_Filling_Knowlege_Extracting/config/document_group_section_search.json"
-    )
+        search_patterns = load_search_patterns(
+            "SEC_Filling_Knowlege_Extracting/config/document_group_section_search.json"
+        )
 
-    content_data = fetch_content_batch(
-        filings_df,
-        search_patterns_path=search_patterns,
-        max_workers=8
-    )
-    content_df = pl.DataFrame(content_data)
+        # Completed filings are recorded once their rows are committed, so an
+        # interrupted run resumes where it stopped. Delta runs always keep one:
+        # its failures hold the watermarks back
+        manifest = None
+        if MANIFEST_ENABLED or watermarks is not None:
+            manifest = ExtractionManifest(f"{search_patterns.version}-p{PARSER_VERSION}")
 
-    content_df = content_df.filter(
-        pl.col("content").is_not_null()
-    )
+        # Sections and table cells are written as they are extracted
+        with FilingSink(on_commit=manifest.mark_done if manifest is not None else None) as sink:
+            fetch_content_batch(
+                filings_df,
+                search_patterns_path=search_patterns,
+                sink=sink,
+                manifest=manifest,
+            )
 
-    content_df.write_parquet(
-        os.path.join("SEC_Filling_Knowlege_Extracting","data", "03_primary", "filing_data.parquet")
-    )
+        if watermarks is not None:
+            watermarks.hold_back(manifest.failed())
+            watermarks.commit()
 
-    logger.info(f"Saved {len(content_df)} extracted sections")
+        if manifest is not None:
+            logger.info(f"Manifest: {manifest.summary()}")
+            section_errors = manifest.section_errors()
+            if section_errors:
+                logger.warning(
+                    f"Manifest: {len(section_errors)} section errors "
+                    f"(pattern timeouts), listed in its section_errors table"
+                )
+            manifest.close()
+    finally:
+        # Also on early returns and errors, or the session is left unclosed
+        get_client().close()
 
 
 if __name__ == "__main__":